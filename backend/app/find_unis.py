@@ -1,11 +1,148 @@
-import requests
+import asyncio
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List
-from bs4 import BeautifulSoup
-from googlesearch import search
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 from langchain.prompts import ChatPromptTemplate
 from langchain_community.tools import Tool
 from tools import llm
+from tools.cache import MISSING, PersistentCache
+from tools.chunking import select_relevant_chunks
+from tools.concurrency import (
+    SingleFlight,
+    aiter_with_deadlines,
+    amap_with_deadlines,
+    iterate_async,
+    run_coroutine,
+)
+from tools.fetcher import ascrape_text_from_url
+from tools.gazetteer import gazetteer
+from tools.names import (
+    UniversityNameIndex,
+    canonical_university_key,
+    canonical_university_name,
+    normalize_university_name,
+    register_alias,
+    register_name,
+)
+from tools.ranking import GPA_THRESHOLDS, rank_universities, score_universities
+from tools.relevance import aclassify_relevance_batch
+from tools.usage import llm_caller
+from tools.web_search import agoogle_search
+
+# Relevance classification of search results
+RELEVANCE_MAX_WORKERS = 6
+RELEVANCE_TIMEOUT = 20  # seconds per classification call
+RELEVANCE_CRITERIA = """
+    Evaluate if the following search result is likely to contain information about university partnerships, 
+    exchange programs, or partner universities for academic institutions.
+"""
+SEARCH_RESULT_RELEVANCE_TEMPLATE = RELEVANCE_CRITERIA + """
+    Title: {title}
+    Description: {snippet}
+    
+    Respond with ONLY 'YES' if the content seems relevant to university partnerships or 'NO' if it does not.
+    """
+
+# Partner extraction
+PARTNER_TEXT_MAX_TOKENS = 6000
+PARTNER_TEXT_QUERY = (
+    "partner universities partner institutions exchange erasmus study abroad "
+    "university universidad universita universite universiteit country city "
+    "partneruniversitaeten partnerhochschulen partnerschaften austausch hochschule"
+)
+
+PARTNER_EXTRACTION_TEMPLATE = """
+    Extract all partner university names from the following text.
+    Return ONLY a list of university names, one per line.
+    If no partner universities are mentioned, return "No partner universities found."
+    
+    Text: {text}
+    """
+
+# University detail fan-out
+DETAIL_MAX_WORKERS = 4
+DETAIL_TIMEOUT = 45  # seconds per university
+
+# University profile store
+PROFILE_TTL = 30 * 24 * 60 * 60  # profiles are regenerated after 30 days
+PROFILE_BATCH_SIZE = 5  # universities per batched profile request
+PROFILE_TEMPLATE = """
+    Provide comprehensive information about {university_name} in JSON format.
+    Include the following fields:
+    1. A brief description of the university (2-3 sentences)
+    2. An estimate of the student count
+    3. A ranking category (high, mid, or low)
+    4. Languages used for instruction
+    5. The country the university is in, by its English name
+    
+    Return ONLY a JSON object with this format:
+    {{
+        "title": "{university_name}",
+        "description": "Brief description of the university",
+        "student_count": estimated_number,
+        "ranking": "high|mid|low",
+        "languages": ["Language1", "Language2"],
+        "country": "Country"
+    }}
+    """
+PROFILE_BATCH_TEMPLATE = """
+    Provide comprehensive information about each of the universities listed below.
+    For each university include:
+    1. A brief description of the university (2-3 sentences)
+    2. An estimate of the student count
+    3. A ranking category (high, mid, or low)
+    4. Languages used for instruction
+    5. The country the university is in, by its English name
+    
+    Universities:
+    {university_list}
+    
+    Return ONLY a JSON array with one object per university, in this format:
+    [
+        {{
+            "index": index_of_the_university_in_the_list,
+            "title": "University Name",
+            "description": "Brief description of the university",
+            "student_count": estimated_number,
+            "ranking": "high|mid|low",
+            "languages": ["Language1", "Language2"],
+            "country": "Country"
+        }}
+    ]
+    """
+
+# University base URL lookup
+BASE_URL_TTL = 180 * 24 * 60 * 60
+BASE_URL_TEMPLATE = """
+    What is the official base website URL for {university_name}?
+    Return ONLY the URL with no additional text or explanations.
+    For example: "https://www.example-university.edu"
+    """
+BASE_URL_SEED_PATH = os.getenv(
+    "BASE_URL_SEED_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "university_urls.json"),
+)
+
+# Partner lists per (home university, major)
+PARTNER_LIST_TTL = 120 * 24 * 60 * 60  # roughly one semester
+
+# Campus image resolution
+IMAGE_TTL = 30 * 24 * 60 * 60
+IMAGE_MISS_TTL = 24 * 60 * 60  # retry universities without an image after a day
+IMAGE_MAX_WORKERS = 4
+
+
+university_profiles = PersistentCache("university_profiles", ttl=PROFILE_TTL)
+university_images = PersistentCache("university_images", ttl=IMAGE_TTL)
+_image_lookups = SingleFlight()
+_image_executor = ThreadPoolExecutor(max_workers=IMAGE_MAX_WORKERS)
+university_base_urls = PersistentCache("university_base_urls", ttl=BASE_URL_TTL)
+_seed_base_urls: Dict[str, str] = {}
+partner_lists = PersistentCache("partner_lists", ttl=PARTNER_LIST_TTL)
 
 
 @dataclass
@@ -23,9 +160,12 @@ class SearchResult:
 
 
 # Search and Scraping Functions
-def google(query: str, num_results: int = 10) -> List[SearchResult]:
+async def agoogle(query: str, num_results: int = 10) -> List[SearchResult]:
     """Perform a Google search and return results as SearchResult objects.
 
+    Results are cached and shared between concurrent identical queries (see
+    tools.web_search.google_search).
+
     Args:
         query (str): The search query.
         num_results (int, optional): Number of results to return. Defaults to 10.
@@ -33,95 +173,142 @@ def google(query: str, num_results: int = 10) -> List[SearchResult]:
     Returns:
         List[SearchResult]: List of search results as SearchResult objects.
     """
-    google_search = search(query, advanced=True, num_results=num_results)
     return [
-        SearchResult(title=result.title, url=result.url, snippet=result.description)
-        for result in google_search
+        SearchResult(title=result["title"], url=result["url"], snippet=result["description"])
+        for result in await agoogle_search(query, num_results=num_results)
     ]
 
 
-def scrape_text_from_url(url: str) -> str:
-    """Extract plain text content from a webpage.
+# Analysis Functions
+@llm_caller("is_relevant_search_result")
+async def ais_relevant_search_result(result: SearchResult) -> bool:
+    """Determine if a search result likely contains university partnership information.
 
     Args:
-        url (str): The URL to scrape.
+        result (SearchResult): The search result to evaluate.
 
     Returns:
-        str: The plain text content extracted from the page.
+        bool: True if the result is relevant, False otherwise.
     """
-    response = requests.get(url)
-    return BeautifulSoup(response.text, "html.parser").get_text()
+    prompt = ChatPromptTemplate.from_template(SEARCH_RESULT_RELEVANCE_TEMPLATE)
+    chain = prompt | llm
+    result_text = await chain.ainvoke({"title": result.title, "snippet": result.snippet})
+    return "YES" in result_text.content.upper()
 
 
-# Analysis Functions
-def is_relevant_search_result(result: SearchResult) -> bool:
-    """Determine if a search result likely contains university partnership information.
+async def aclassify_search_results(
+    search_results: List[SearchResult],
+    max_concurrency: int = RELEVANCE_MAX_WORKERS,
+    timeout: float = RELEVANCE_TIMEOUT,
+) -> List[bool]:
+    """Run ais_relevant_search_result for all search results concurrently.
 
     Args:
-        result (SearchResult): The search result to evaluate.
+        search_results (List[SearchResult]): The search results to evaluate.
+        max_concurrency (int, optional): Maximum number of concurrent LLM calls.
+            Defaults to RELEVANCE_MAX_WORKERS.
+        timeout (float, optional): Seconds a single classification may take before the
+            result is treated as not relevant. Defaults to RELEVANCE_TIMEOUT.
 
     Returns:
-        bool: True if the result is relevant, False otherwise.
-    """
-    template = """
-    Evaluate if the following search result is likely to contain information about university partnerships, 
-    exchange programs, or partner universities for academic institutions.
-    
-    Title: {title}
-    Description: {snippet}
-    
-    Respond with ONLY 'YES' if the content seems relevant to university partnerships or 'NO' if it does not.
+        List[bool]: Relevance flags in the same order as the search results.
     """
-
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm
-    result_text = chain.invoke(
-        {
-            "title": result.title,
-            "snippet": result.snippet,
-        }
+    return await amap_with_deadlines(
+        ais_relevant_search_result,
+        search_results,
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+        fallback=_not_relevant,
     )
 
-    return "YES" in result_text.content.upper()
 
+def _not_relevant(result: SearchResult, error: Exception = None) -> bool:
+    # Fallback for a relevance check that failed or timed out.
+    if error is None:
+        print(f"Relevance check timed out for {result.url}")
+    else:
+        print(f"Error checking relevance of {result.url}: {str(error)}")
+    return False
+
+
+async def aclassify_search_results_batch(search_results: List[SearchResult]) -> List[bool]:
+    """Classify all search results in a single LLM call.
 
-def extract_partner_universities(text: str) -> List[str]:
+    Results the model did not answer for are re-checked individually with
+    aclassify_search_results.
+
+    Args:
+        search_results (List[SearchResult]): The search results to evaluate.
+
+    Returns:
+        List[bool]: Relevance flags in the same order as the search results.
+    """
+    verdicts = await aclassify_relevance_batch(
+        [{"title": r.title, "snippet": r.snippet} for r in search_results],
+        RELEVANCE_CRITERIA,
+    )
+    missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    if missing:
+        retried = await aclassify_search_results([search_results[i] for i in missing])
+        for i, relevant in zip(missing, retried):
+            verdicts[i] = relevant
+    return verdicts
+
+
+@llm_caller("extract_partner_universities")
+async def aextract_partner_universities(text: str) -> List[str]:
     """Extract partner university names from text using LLM.
 
+    Long texts are reduced to the chunks most relevant to partner universities,
+    up to PARTNER_TEXT_MAX_TOKENS.
+
     Args:
         text (str): The text to analyze.
 
     Returns:
         List[str]: List of partner university names.
     """
-    template = """
-    Extract all partner university names from the following text.
-    Return ONLY a list of university names, one per line.
-    If no partner universities are mentioned, return "No partner universities found."
-    
-    Text: {text}
-    """
-
-    prompt = ChatPromptTemplate.from_template(template)
+    text = await asyncio.to_thread(
+        select_relevant_chunks, text, PARTNER_TEXT_QUERY, PARTNER_TEXT_MAX_TOKENS
+    )
+    prompt = ChatPromptTemplate.from_template(PARTNER_EXTRACTION_TEMPLATE)
     chain = prompt | llm
-    result = chain.invoke({"text": text})
+    result = await chain.ainvoke({"text": text})
+    return parse_partner_universities(result.content)
+
+
+def parse_partner_universities(content: str) -> List[str]:
+    """Parse the university names of a partner extraction response.
 
-    if "No partner universities found" in result.content:
+    Args:
+        content (str): The LLM response, one university per line.
+
+    Returns:
+        List[str]: List of partner university names.
+    """
+    if "No partner universities found" in content:
         return []
 
-    universities = [line.strip() for line in result.content.split("\n") if line.strip()]
+    # Drop list markers such as "-", "*" or "1." so variants deduplicate cleanly.
+    lines = (re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line) for line in content.split("\n"))
+    universities = [line.strip() for line in lines if line.strip()]
     return universities
 
 
 # Main Processing Functions
-def find_partner_universities_from_results(
-    search_results: List[SearchResult], query: str = ""
+async def afind_partner_universities_from_results(
+    search_results: List[SearchResult], query: str = "", relevance_mode: str = "batch"
 ) -> str:
     """Process search results to extract partner universities.
 
+    The relevant pages are scraped and analyzed concurrently.
+
     Args:
         search_results (List[SearchResult]): List of search results.
         query (str, optional): Search query for context. Defaults to "".
+        relevance_mode (str, optional): How search results are classified: "batch"
+            (one prompt for all results), "concurrent" (one call per result, in
+            parallel) or "serial". Defaults to "batch".
 
     Returns:
         str: A formatted string listing partner universities found, or an error message.
@@ -129,33 +316,52 @@ def find_partner_universities_from_results(
     if not search_results:
         return "No search results provided."
 
-    relevant_results = [r for r in search_results if is_relevant_search_result(r)][:4]
+    if relevance_mode == "batch":
+        relevance = await aclassify_search_results_batch(search_results)
+    elif relevance_mode == "concurrent":
+        relevance = await aclassify_search_results(search_results)
+    else:
+        relevance = [await ais_relevant_search_result(r) for r in search_results]
+    relevant_results = [r for r, relevant in zip(search_results, relevance) if relevant][:4]
 
     if not relevant_results:
         return "No relevant search results found for partner universities."
 
+    async def process(url: str) -> List[str]:
+        text = await ascrape_text_from_url(url)
+        return await aextract_partner_universities(text)
+
+    urls = list(dict.fromkeys(result.url for result in relevant_results))
     all_universities = []
-    processed_urls = []
     errors = []
+    for url, universities in zip(
+        urls, await asyncio.gather(*(process(url) for url in urls), return_exceptions=True)
+    ):
+        if isinstance(universities, Exception):
+            errors.append(f"Error processing {url}: {str(universities)}")
+        elif universities:
+            all_universities.extend(universities)
 
-    for result in relevant_results:
-        try:
-            if result.url in processed_urls:
-                continue
+    return format_partner_universities(all_universities, errors)
 
-            processed_urls.append(result.url)
-            text = scrape_text_from_url(result.url)
-            universities = extract_partner_universities(text)
 
-            if universities:
-                all_universities.extend(universities)
-        except Exception as e:
-            errors.append(f"Error processing {result.url}: {str(e)}")
+def format_partner_universities(all_universities: List[str], errors: List[str]) -> str:
+    """Deduplicate extracted partner universities and format them for SearchAgent.
 
+    Args:
+        all_universities (List[str]): Extracted names, possibly with duplicates.
+        errors (List[str]): Errors of pages that could not be processed.
+
+    Returns:
+        str: A formatted string listing partner universities found, or an error message.
+    """
     unique_universities = []
+    seen_names = UniversityNameIndex()
     for uni in all_universities:
-        if uni not in unique_universities:
-            unique_universities.append(uni)
+        canonical_name = canonical_university_name(uni)
+        if seen_names.lookup(canonical_name) is None:
+            seen_names.add(canonical_name)
+            unique_universities.append(canonical_name)
 
     if not unique_universities:
         return "No partner universities found in the relevant search results."
@@ -168,7 +374,7 @@ def find_partner_universities_from_results(
     return response
 
 
-def find_partner_universities(url: str, query: str = "") -> str:
+async def afind_partner_universities(url: str, query: str = "") -> str:
     """Scrape a URL and extract partner university names.
 
     Args:
@@ -179,8 +385,8 @@ def find_partner_universities(url: str, query: str = "") -> str:
         str: A formatted string listing partner universities found, or an error message.
     """
     try:
-        text = scrape_text_from_url(url)
-        universities = extract_partner_universities(text)
+        text = await ascrape_text_from_url(url)
+        universities = await aextract_partner_universities(text)
 
         if not universities:
             return "No partner universities found on this website."
@@ -192,7 +398,8 @@ def find_partner_universities(url: str, query: str = "") -> str:
 
 # Create LangChain tool
 university_finder_tool = Tool.from_function(
-    func=lambda params: find_partner_universities_from_results(
+    func=None,
+    coroutine=lambda params: afind_partner_universities_from_results(
         params["search_results"], params["query"]
     ),
     name="UniversityPartnerFinder",
@@ -200,8 +407,35 @@ university_finder_tool = Tool.from_function(
 )
 
 
-def get_university_base_url(university_name: str) -> str:
-    """Ask LLM to provide the base URL for a university.
+def load_base_url_seed(path: str = BASE_URL_SEED_PATH) -> None:
+    """Preload known university base URLs and name aliases from a JSON seed file.
+
+    The file contains a list of objects with "name", "url" and optional "aliases".
+
+    Args:
+        path (str, optional): Path of the seed file. Defaults to BASE_URL_SEED_PATH.
+    """
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error loading university URL seed file {path}: {str(e)}")
+        return
+
+    for entry in entries:
+        for alias in entry.get("aliases", []):
+            register_alias(alias, entry["name"])
+        register_name(entry["name"])
+        _seed_base_urls[canonical_university_key(entry["name"])] = entry["url"]
+
+
+async def aget_university_base_url(university_name: str) -> str:
+    """Return the base URL for a university, asking the LLM only on a cache miss.
+
+    Lookups go through the seed file entries, the gazetteer and then the persistent
+    cache, all keyed by canonical_university_key so that name variants share an entry.
 
     Args:
         university_name (str): The name of the university.
@@ -209,28 +443,68 @@ def get_university_base_url(university_name: str) -> str:
     Returns:
         str: The official base URL of the university.
     """
-    template = """
-    What is the official base website URL for {university_name}?
-    Return ONLY the URL with no additional text or explanations.
-    For example: "https://www.example-university.edu"
+    url = await asyncio.to_thread(known_university_base_url, university_name)
+    if url:
+        return url
+
+    url = await aask_university_base_url(university_name)
+    if url:
+        await asyncio.to_thread(
+            university_base_urls.set, canonical_university_key(university_name), url
+        )
+    return url
+
+
+def known_university_base_url(university_name: str) -> Optional[str]:
+    """Look up the base URL of a university without asking the LLM.
+
+    Args:
+        university_name (str): The name of the university.
+
+    Returns:
+        Optional[str]: The base URL from the seed file, gazetteer or cache, or None.
     """
+    key = canonical_university_key(university_name)
+    if key in _seed_base_urls:
+        return _seed_base_urls[key]
+    entry = gazetteer.lookup(university_name)
+    if entry is not None:
+        return f"https://{entry['domain']}"
+    return university_base_urls.get(key)
 
-    prompt = ChatPromptTemplate.from_template(template)
+
+@llm_caller("get_university_base_url")
+async def aask_university_base_url(university_name: str) -> str:
+    """Ask LLM to provide the base URL for a university.
+
+    Args:
+        university_name (str): The name of the university.
+
+    Returns:
+        str: The official base URL of the university.
+    """
+    prompt = ChatPromptTemplate.from_template(BASE_URL_TEMPLATE)
     chain = prompt | llm
     try:
-        result = chain.invoke({"university_name": university_name})
-        url = result.content.strip().replace('"', "").replace("'", "")
-        return url
+        result = await chain.ainvoke({"university_name": university_name})
+        return result.content.strip().replace('"', "").replace("'", "")
     except Exception as e:
         print(f"Error getting university base URL: {str(e)}")
         return ""
 
 
+load_base_url_seed()
+
+
+@llm_caller("filter_partner_universities")
 def filter_partner_universities(
     universities: List[str], input_dict: dict
 ) -> List[dict]:
     """Filter partner universities based on input criteria (languages, GPA).
 
+    Universities found in the gazetteer are known to be real and are evaluated
+    locally from their base facts; only the remaining names are sent to the LLM.
+
     Args:
         universities (List[str]): List of university names.
         input_dict (dict): Dictionary with filter criteria (languages, gpa).
@@ -241,7 +515,30 @@ def filter_partner_universities(
     if not universities:
         return []
 
-    university_list = "\n".join(universities)
+    known_universities = []
+    unknown_universities = []
+    for university in universities:
+        entry = gazetteer.lookup(university)
+        if entry is None:
+            unknown_universities.append(university)
+            continue
+        spoken = {language.lower() for language in input_dict["languages"]}
+        required_gpa = GPA_THRESHOLDS.get(entry["ranking"], GPA_THRESHOLDS["mid"])
+        known_universities.append(
+            {
+                "name": entry["name"],
+                "language_match": any(l.lower() in spoken for l in entry["languages"]),
+                "gpa_sufficient": input_dict["gpa"] >= required_gpa,
+                "comments": (
+                    f"Teaches in {', '.join(entry['languages'])}; "
+                    f"{entry['ranking']}-ranked, typically requires a GPA of about {required_gpa}."
+                ),
+            }
+        )
+    if not unknown_universities:
+        return known_universities
+
+    university_list = "\n".join(unknown_universities)
     student_languages = ", ".join(input_dict["languages"])
 
     template = """
@@ -284,12 +581,12 @@ def filter_partner_universities(
         filtered_universities = json.loads(response_text)
         if not isinstance(filtered_universities, list):
             filtered_universities = [filtered_universities]  # Handle single object
-        return filtered_universities
+        return known_universities + filtered_universities
 
     except json.JSONDecodeError as e:
         print(f"Error parsing LLM response: {e}")
         print(f"Response was: {response_text}")
-        return []
+        return known_universities
 
 
 def search_university_image(university_name: str) -> str:
@@ -300,88 +597,498 @@ def search_university_image(university_name: str) -> str:
 
     Returns:
         str: URL to an image of the university, or None if not found.
+
+    Raises:
+        Exception: If the search fails, e.g. because of a rate limit.
     """
-    try:
-        from duckduckgo_search import DDGS
-
-        ddgs = DDGS()
-        query = f"{university_name} university campus"
-        images = list(ddgs.images(query, max_results=5))
-        for image in images:
-            if image and "image" in image and image["image"]:
-                # Verify it's an image URL
-                if any(
-                    ext in image["image"].lower()
-                    for ext in [".jpg", ".jpeg", ".png", ".gif"]
-                ):
-                    return image["image"]
-        return None
+    from duckduckgo_search import DDGS
+
+    ddgs = DDGS()
+    query = f"{university_name} university campus"
+    images = list(ddgs.images(query, max_results=5))
+    for image in images:
+        if image and "image" in image and image["image"]:
+            # Verify it's an image URL
+            if any(
+                ext in image["image"].lower()
+                for ext in [".jpg", ".jpeg", ".png", ".gif"]
+            ):
+                return image["image"]
+    return None
+
+
+def resolve_university_image(university_name: str, refresh: bool = False) -> Optional[str]:
+    """Return the campus image of a university, searching for it only on a cache miss.
+
+    Misses are cached as well (for IMAGE_MISS_TTL), and concurrent lookups for the
+    same university share a single search. Failed searches are not cached.
+
+    Args:
+        university_name (str): The name of the university.
+        refresh (bool, optional): Search again even if an image is cached.
+            Defaults to False.
+
+    Returns:
+        Optional[str]: URL to an image of the university, or None if not found.
+
+    Raises:
+        Exception: If the search fails.
+    """
+    key = canonical_university_key(university_name)
+    image = MISSING if refresh else university_images.get(key, MISSING)
+    if image is not MISSING:
+        return image
+
+    def lookup() -> Optional[str]:
+        image = search_university_image(university_name)
+        university_images.set(key, image, ttl=IMAGE_TTL if image else IMAGE_MISS_TTL)
+        return image
+
+    return _image_lookups.do(key, lookup)
+
+
+def get_cached_university_image(university_name: str) -> Tuple[Optional[str], bool]:
+    """Look up the campus image of a university without searching for it.
+
+    Args:
+        university_name (str): The name of the university.
+
+    Returns:
+        Tuple[Optional[str], bool]: The image URL (or None) and whether the image has
+            been resolved yet.
+    """
+    image = university_images.get(canonical_university_key(university_name), MISSING)
+    if image is MISSING:
+        return None, False
+    return image, True
+
+
+def try_resolve_university_image(university_name: str) -> Optional[str]:
+    """Return the campus image of a university, or None if the search fails.
+
+    Args:
+        university_name (str): The name of the university.
 
+    Returns:
+        Optional[str]: URL to an image of the university, or None.
+    """
+    try:
+        return resolve_university_image(university_name)
     except Exception as e:
         print(f"Error searching for image: {str(e)}")
         return None
 
 
-def get_university_details(university_name: str, student_languages: List[str]) -> dict:
-    """Use LLM to generate comprehensive details about a university and search for a real image.
+def prefetch_university_images(university_names: List[str]) -> None:
+    """Resolve campus images in the background for universities not yet cached.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+    """
+    for university_name in university_names:
+        if not get_cached_university_image(university_name)[1]:
+            _image_executor.submit(
+                contextvars.copy_context().run, try_resolve_university_image, university_name
+            )
+
+
+def unavailable_university_details(university_name: str, image: str = None) -> dict:
+    """Build the fallback details for a university whose information could not be generated.
 
     Args:
         university_name (str): Name of the university.
-        student_languages (List[str]): List of languages the student knows.
+        image (str, optional): Image URL, if one is known. Defaults to None.
 
     Returns:
-        dict: Dictionary with university details, including title, description, image URL, student count, ranking, and languages.
+        dict: Placeholder university details in the same shape as aget_university_details.
     """
-    template = """
-    Provide comprehensive information about {university_name} in JSON format.
-    Include the following fields:
-    1. A brief description of the university (2-3 sentences)
-    2. An estimate of the student count
-    3. A ranking category (high, mid, or low)
-    4. Languages used for instruction
-    
-    Consider the student's language proficiencies ({languages}) when assessing compatibility.
-    
-    Return ONLY a JSON object with this format:
-    {{
-        "title": "{university_name}",
-        "description": "Brief description of the university",
-        "student_count": estimated_number,
-        "ranking": "high|mid|low",
-        "languages": ["Language1", "Language2"]
-    }}
+    return {
+        "title": university_name,
+        "description": "Information unavailable",
+        "image": image,
+        "student_count": 0,
+        "ranking": "unknown",
+        "languages": [],
+    }
+
+
+def parse_json_objects(text: str) -> List[dict]:
+    """Extract every well-formed JSON object from an LLM response.
+
+    Objects are decoded one at a time, so a malformed entry in a list only loses
+    that entry instead of the whole response.
+
+    Args:
+        text (str): The raw LLM response.
+
+    Returns:
+        List[dict]: The decoded objects, in order of appearance.
     """
+    decoder = json.JSONDecoder()
+    objects = []
+    position = text.find("{")
+    while position != -1:
+        try:
+            obj, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find("{", position + 1)
+            continue
+        if isinstance(obj, dict):
+            objects.append(obj)
+        position = text.find("{", end)
+    return objects
 
-    prompt = ChatPromptTemplate.from_template(template)
+
+@llm_caller("get_university_details")
+async def agenerate_university_profile(university_name: str) -> Optional[dict]:
+    """Use LLM to generate the student-independent profile of a university.
+
+    Args:
+        university_name (str): Name of the university.
+
+    Returns:
+        Optional[dict]: Dictionary with title, description, student count, ranking,
+            and languages, or None if the LLM response could not be parsed.
+    """
+    prompt = ChatPromptTemplate.from_template(PROFILE_TEMPLATE)
     chain = prompt | llm
-    result = chain.invoke(
-        {
-            "university_name": university_name,
-            "languages": ", ".join(student_languages),
-        }
-    )
+    result = await chain.ainvoke({"university_name": university_name})
+    return parse_university_profile(result.content, university_name)
 
-    import json
+
+def parse_university_profile(content: str, university_name: str) -> Optional[dict]:
+    """Parse the response of a profile request.
+
+    Args:
+        content (str): The LLM response.
+        university_name (str): Name of the university, for the error message.
+
+    Returns:
+        Optional[dict]: The university profile, or None if no JSON object was found.
+    """
+    objects = parse_json_objects(content)
+    if not objects:
+        print(f"Error parsing LLM response for {university_name}: no JSON object found")
+        return None
+    university_data = objects[0]
+    university_data.pop("image", None)
+    return university_data
+
+
+@llm_caller("get_university_details_batch")
+async def agenerate_university_profiles(university_names: List[str]) -> List[Optional[dict]]:
+    """Use LLM to generate the profiles of several universities in a single call.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+
+    Returns:
+        List[Optional[dict]]: One profile per name, in the same order; None where the
+            corresponding entry was missing or malformed.
+    """
+    prompt = ChatPromptTemplate.from_template(PROFILE_BATCH_TEMPLATE)
+    chain = prompt | llm
     try:
-        response_text = result.content.strip()
-        if "```" in response_text:
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:].strip()
-        university_data = json.loads(response_text)
-        university_data["image"] = search_university_image(university_name)
-        return university_data
+        result = await chain.ainvoke(
+            {"university_list": format_university_list(university_names)}
+        )
+    except Exception as e:
+        print(f"Error generating university profiles in batch: {str(e)}")
+        return [None] * len(university_names)
+    return parse_university_profiles(result.content, university_names)
+
+
+def format_university_list(university_names: List[str]) -> str:
+    """Render university names as the indexed list of a batched profile request.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+
+    Returns:
+        str: One "<index>. <name>" line per university.
+    """
+    return "\n".join(f"{index}. {name}" for index, name in enumerate(university_names))
+
+
+def parse_university_profiles(content: str, university_names: List[str]) -> List[Optional[dict]]:
+    """Parse the response of a batched profile request.
+
+    Entries are matched to names by their index, or by title if the index is
+    missing; malformed entries are skipped.
+
+    Args:
+        content (str): The LLM response.
+        university_names (List[str]): Names of the requested universities.
+
+    Returns:
+        List[Optional[dict]]: One profile per name, in the same order; None where the
+            corresponding entry was missing or malformed.
+    """
+    profiles: List[Optional[dict]] = [None] * len(university_names)
+    positions = {
+        canonical_university_key(name): index for index, name in enumerate(university_names)
+    }
+    required_fields = ("description", "student_count", "ranking", "languages")
+    for university_data in parse_json_objects(content):
+        index = university_data.pop("index", None)
+        if not isinstance(index, int) or not 0 <= index < len(university_names):
+            index = positions.get(canonical_university_key(str(university_data.get("title", ""))))
+        if index is None or profiles[index] is not None:
+            continue
+        if not all(field in university_data for field in required_fields):
+            continue
+        university_data.pop("image", None)
+        university_data["title"] = university_data.get("title") or university_names[index]
+        profiles[index] = university_data
+
+    missing = [university_names[i] for i, profile in enumerate(profiles) if profile is None]
+    if missing:
+        print(f"Batch response had no usable entry for: {', '.join(missing)}")
+    return profiles
+
+
+def find_stored_university_profile(university_name: str) -> Optional[dict]:
+    """Look up a university profile without generating it.
+
+    Checks the gazetteer, then the profile store under the name's canonical key.
+    Names are not matched by similarity, since similar names such as "Lyon 2" and
+    "Lyon 3" often belong to different universities.
+
+    Args:
+        university_name (str): Name of the university.
+
+    Returns:
+        Optional[dict]: The university profile, or None if none is stored.
+    """
+    profile = gazetteer.profile(university_name)
+    if profile is not None:
+        return profile
+
+    return university_profiles.get(canonical_university_key(university_name))
+
+
+def store_university_profile(university_name: str, profile: dict) -> None:
+    """Store a generated university profile.
+
+    Args:
+        university_name (str): Name of the university.
+        profile (dict): The university profile.
+    """
+    university_profiles.set(canonical_university_key(university_name), profile)
 
-    except json.JSONDecodeError as e:
-        print(f"Error parsing LLM response for {university_name}: {e}")
-        return {
-            "title": university_name,
-            "description": "Information unavailable",
-            "image": search_university_image(university_name),
-            "student_count": 0,
-            "ranking": "unknown",
-            "languages": [],
-        }
+
+async def aget_university_profile(university_name: str, refresh: bool = False) -> Optional[dict]:
+    """Return the stored profile of a university, generating it on a miss or after PROFILE_TTL.
+
+    Universities in the gazetteer are served from its base facts without the LLM.
+
+    Args:
+        university_name (str): Name of the university.
+        refresh (bool, optional): Regenerate the profile even if a fresh one is stored.
+            Defaults to False.
+
+    Returns:
+        Optional[dict]: The university profile, or None if it could not be generated.
+    """
+    if refresh:
+        profile = gazetteer.profile(university_name)
+    else:
+        profile = await asyncio.to_thread(find_stored_university_profile, university_name)
+    if profile is not None:
+        return profile
+
+    profile = await agenerate_university_profile(university_name)
+    if profile is not None:
+        await asyncio.to_thread(store_university_profile, university_name, profile)
+    return profile
+
+
+async def aiter_university_profiles(
+    university_names: List[str],
+    batch_size: int = PROFILE_BATCH_SIZE,
+    max_concurrency: int = DETAIL_MAX_WORKERS,
+    timeout: float = DETAIL_TIMEOUT,
+    refresh: bool = False,
+) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """Yield the profiles of several universities as they become available, generating misses in batched calls.
+
+    Gazetteer and cached profiles are yielded first. The remaining universities are
+    requested in chunks of ``batch_size`` per LLM call, with the chunks running
+    concurrently; universities a chunk did not return usable data for are generated
+    individually once, and each chunk's profiles are yielded as soon as that is done.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+        batch_size (int, optional): Universities per LLM call. Defaults to PROFILE_BATCH_SIZE.
+        max_concurrency (int, optional): Maximum number of concurrent LLM calls.
+            Defaults to DETAIL_MAX_WORKERS.
+        timeout (float, optional): Seconds allowed per LLM call. Defaults to DETAIL_TIMEOUT.
+        refresh (bool, optional): Regenerate profiles even if fresh ones are stored.
+            Defaults to False.
+
+    Yields:
+        Tuple[int, Optional[dict]]: The index of a university name and its profile,
+            or None if the profile could not be generated.
+    """
+    if refresh:
+        profiles = [gazetteer.profile(name) for name in university_names]
+    else:
+        profiles = await asyncio.gather(
+            *(asyncio.to_thread(find_stored_university_profile, name) for name in university_names)
+        )
+    missing = []
+    for index, profile in enumerate(profiles):
+        if profile is None:
+            missing.append(index)
+        else:
+            yield index, profile
+    if not missing:
+        return
+
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def call(func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        # One LLM call, holding one of the max_concurrency slots for at most timeout seconds.
+        async with slots:
+            return await asyncio.wait_for(func(*args), timeout)
+
+    async def generate(chunk: List[int]) -> List[Tuple[int, Optional[dict]]]:
+        names = [university_names[i] for i in chunk]
+        try:
+            chunk_profiles = await call(agenerate_university_profiles, names)
+        except Exception as e:
+            print(f"Error generating profiles for {', '.join(names)}: {str(e) or 'timed out'}")
+            chunk_profiles = [None] * len(names)
+        retry = [i for i, profile in enumerate(chunk_profiles) if profile is None]
+        retried = await asyncio.gather(
+            *(call(agenerate_university_profile, names[i]) for i in retry), return_exceptions=True
+        )
+        for i, profile in zip(retry, retried):
+            if isinstance(profile, Exception):
+                print(f"Error generating profile for {names[i]}: {str(profile) or 'timed out'}")
+            else:
+                chunk_profiles[i] = profile
+        for name, profile in zip(names, chunk_profiles):
+            if profile is not None:
+                await asyncio.to_thread(store_university_profile, name, profile)
+        return list(zip(chunk, chunk_profiles))
+
+    tasks = [
+        asyncio.ensure_future(generate(missing[i:i + batch_size]))
+        for i in range(0, len(missing), batch_size)
+    ]
+    try:
+        for next_chunk in asyncio.as_completed(tasks):
+            for index, profile in await next_chunk:
+                yield index, profile
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def aget_university_profiles(
+    university_names: List[str],
+    batch_size: int = PROFILE_BATCH_SIZE,
+    max_concurrency: int = DETAIL_MAX_WORKERS,
+    timeout: float = DETAIL_TIMEOUT,
+    refresh: bool = False,
+) -> List[Optional[dict]]:
+    """Return the profiles of several universities, generating all misses in batched calls.
+
+    See aiter_university_profiles.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+        batch_size (int, optional): Universities per LLM call. Defaults to PROFILE_BATCH_SIZE.
+        max_concurrency (int, optional): Maximum number of concurrent LLM calls.
+            Defaults to DETAIL_MAX_WORKERS.
+        timeout (float, optional): Seconds allowed per LLM call. Defaults to DETAIL_TIMEOUT.
+        refresh (bool, optional): Regenerate profiles even if fresh ones are stored.
+            Defaults to False.
+
+    Returns:
+        List[Optional[dict]]: One profile per name, in the same order; None where the
+            profile could not be generated.
+    """
+    profiles: List[Optional[dict]] = [None] * len(university_names)
+    async for index, profile in aiter_university_profiles(
+        university_names, batch_size, max_concurrency, timeout, refresh
+    ):
+        profiles[index] = profile
+    return profiles
+
+
+def apply_student_languages(profile: dict, student_languages: List[str]) -> dict:
+    """Tailor a stored university profile to a student's languages.
+
+    Instruction languages the student speaks are listed first and ``language_match``
+    records whether there is any overlap.
+
+    Args:
+        profile (dict): The university profile.
+        student_languages (List[str]): List of languages the student knows.
+
+    Returns:
+        dict: A copy of the profile with student-specific language information.
+    """
+    spoken = {language.strip().lower() for language in student_languages}
+    languages = profile.get("languages") or []
+    matching = [language for language in languages if language.strip().lower() in spoken]
+    details = dict(profile)
+    details["languages"] = matching + [l for l in languages if l not in matching]
+    details["language_match"] = bool(matching)
+    return details
+
+
+async def aget_university_details(
+    university_name: str, student_languages: List[str], wait_for_image: bool = False
+) -> dict:
+    """Get comprehensive details about a university for a student.
+
+    The student-independent profile comes from the local profile store and is only
+    generated by the LLM on a miss; language filtering runs on the stored record.
+    The campus image is taken from the image cache; if it has not been resolved yet it
+    is looked up in the background and ``image`` is None unless ``wait_for_image`` is set.
+
+    Args:
+        university_name (str): Name of the university.
+        student_languages (List[str]): List of languages the student knows.
+        wait_for_image (bool, optional): Wait until the image is resolved. Defaults to False.
+
+    Returns:
+        dict: Dictionary with university details, including title, description, image URL, student count, ranking, and languages.
+    """
+    if wait_for_image:
+        image = await asyncio.to_thread(try_resolve_university_image, university_name)
+    else:
+        image, resolved = await asyncio.to_thread(get_cached_university_image, university_name)
+        if not resolved:
+            await asyncio.to_thread(prefetch_university_images, [university_name])
+
+    profile = await aget_university_profile(university_name)
+    return university_details(university_name, profile, student_languages, image)
+
+
+def university_details(
+    university_name: str, profile: Optional[dict], student_languages: List[str], image: str = None
+) -> dict:
+    """Combine a university profile and campus image into a student's view of the university.
+
+    Args:
+        university_name (str): Name of the university.
+        profile (Optional[dict]): The university profile, or None if it is unavailable.
+        student_languages (List[str]): List of languages the student knows.
+        image (str, optional): Image URL, if one is known. Defaults to None.
+
+    Returns:
+        dict: Dictionary with university details, or the "Information unavailable"
+            fallback if there is no profile.
+    """
+    if profile is None:
+        return unavailable_university_details(university_name, image)
+    details = apply_student_languages(profile, student_languages)
+    details["image"] = image
+    return details
 
 
 class Agent:
@@ -406,6 +1113,41 @@ class Agent:
         """
         raise NotImplementedError("Subclasses must implement this method")
 
+    def report(self, message: str, on_progress: Callable[[str], None] = None) -> None:
+        """Log a progress message and forward it to an optional progress callback.
+
+        Args:
+            message (str): The progress message.
+            on_progress (Callable[[str], None], optional): Receives the message.
+                Defaults to None.
+        """
+        print(f"[{self.name}] {message}")
+        if on_progress is not None:
+            on_progress(message)
+
+
+def partner_list_key(university: str, major: str) -> str:
+    """Build the partner list cache key for a home university and major.
+
+    Args:
+        university (str): Name of the student's home university.
+        major (str): Student's major.
+
+    Returns:
+        str: The normalized cache key.
+    """
+    return f"{canonical_university_key(university)}|{normalize_university_name(major)}"
+
+
+def invalidate_partner_list(university: str, major: str) -> None:
+    """Drop the cached partner list of a home university and major.
+
+    Args:
+        university (str): Name of the student's home university.
+        major (str): Student's major.
+    """
+    partner_lists.delete(partner_list_key(university, major))
+
 
 class SearchAgent(Agent):
     """Agent responsible for searching and finding partner universities."""
@@ -413,29 +1155,113 @@ class SearchAgent(Agent):
         """Initialize the SearchAgent."""
         super().__init__("SearchAgent")
 
-    def run(self, input_dict: Dict[str, Any]) -> List[str]:
+    async def arun(
+        self,
+        input_dict: Dict[str, Any],
+        refresh: bool = False,
+        on_progress: Callable[[str], None] = None,
+    ) -> List[str]:
         """Search for partner universities based on the input criteria.
 
+        Partner lists are cached per (home university, major) for PARTNER_LIST_TTL,
+        so the search only runs on a miss.
+
         Args:
             input_dict (Dict[str, Any]): Dictionary containing university, major, etc.
+            refresh (bool, optional): Ignore a cached partner list. Defaults to False.
+            on_progress (Callable[[str], None], optional): Receives progress messages.
+                Defaults to None.
 
         Returns:
             List[str]: List of university names.
         """
-        print(f"[{self.name}] Searching for partner universities...")
-        university_url = get_university_base_url(input_dict["university"])
-        query = f"{input_dict['university']} {input_dict['major']} (Erasmus) Partner Universitäten {university_url}"
-        print(f"[{self.name}] Search query: {query}")
-        results = google(query, num_results=6)
+        key = partner_list_key(input_dict["university"], input_dict["major"])
+        if not refresh:
+            university_list = await asyncio.to_thread(partner_lists.get, key)
+            if university_list is not None:
+                self.report(
+                    f"Using {len(university_list)} cached partner universities", on_progress
+                )
+                return university_list
+
+        university_list = await self.asearch(input_dict, on_progress)
+        if university_list:
+            await asyncio.to_thread(partner_lists.set, key, university_list)
+        return university_list
+
+    def run(
+        self,
+        input_dict: Dict[str, Any],
+        refresh: bool = False,
+        on_progress: Callable[[str], None] = None,
+    ) -> List[str]:
+        """Synchronous version of arun, for the command line and the warmup.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary containing university, major, etc.
+            refresh (bool, optional): Ignore a cached partner list. Defaults to False.
+            on_progress (Callable[[str], None], optional): Receives progress messages.
+                Defaults to None.
+
+        Returns:
+            List[str]: List of university names.
+        """
+        return run_coroutine(self.arun(input_dict, refresh, on_progress))
+
+    async def asearch(
+        self, input_dict: Dict[str, Any], on_progress: Callable[[str], None] = None
+    ) -> List[str]:
+        """Search the web for partner universities based on the input criteria.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary containing university, major, etc.
+            on_progress (Callable[[str], None], optional): Receives progress messages.
+                Defaults to None.
+
+        Returns:
+            List[str]: List of university names.
+        """
+        self.report("Searching for partner universities...", on_progress)
+        university_url = await aget_university_base_url(input_dict["university"])
+        query = self.query(input_dict, university_url)
+        self.report(f"Search query: {query}", on_progress)
+        results = await agoogle(query, num_results=6)
 
         if not results:
-            print(f"[{self.name}] No search results found")
+            self.report("No search results found", on_progress)
             return []
 
-        print(f"[{self.name}] Found {len(results)} search results")
-        print(f"[{self.name}] Processing search results...")
-        universities_text = find_partner_universities_from_results(results, query)
+        self.report(f"Found {len(results)} search results", on_progress)
+        self.report("Processing search results...", on_progress)
+        universities_text = await afind_partner_universities_from_results(results, query)
+        return self.partner_names(universities_text, on_progress)
 
+    @staticmethod
+    def query(input_dict: Dict[str, Any], university_url: str) -> str:
+        """Build the web search query for partner universities.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary containing university and major.
+            university_url (str): Base URL of the home university.
+
+        Returns:
+            str: The search query.
+        """
+        return f"{input_dict['university']} {input_dict['major']} (Erasmus) Partner Universitäten {university_url}"
+
+    def partner_names(
+        self, universities_text: str, on_progress: Callable[[str], None] = None
+    ) -> List[str]:
+        """Parse the partner universities found in the search results.
+
+        Args:
+            universities_text (str): Output of afind_partner_universities_from_results.
+            on_progress (Callable[[str], None], optional): Receives progress messages.
+                Defaults to None.
+
+        Returns:
+            List[str]: Up to eight university names.
+        """
         if "Partner universities found:" in universities_text:
             university_lines = (
                 universities_text.split("Partner universities found:")[1]
@@ -446,9 +1272,9 @@ class SearchAgent(Agent):
                 u.strip() for u in university_lines.split("\n") if u.strip()
             ]
             university_list = university_list[:8]
-            print(f"[{self.name}] Found {len(university_list)} partner universities")
+            self.report(f"Found {len(university_list)} partner universities", on_progress)
             return university_list
-        print(f"[{self.name}] No partner universities found")
+        self.report("No partner universities found", on_progress)
         return []
 
 
@@ -458,7 +1284,7 @@ class DetailAgent(Agent):
         """Initialize the DetailAgent."""
         super().__init__("DetailAgent")
 
-    def run(self, university_name: str, student_languages: List[str]) -> Dict[str, Any]:
+    async def arun(self, university_name: str, student_languages: List[str]) -> Dict[str, Any]:
         """Get detailed information about a university.
 
         Args:
@@ -468,8 +1294,93 @@ class DetailAgent(Agent):
         Returns:
             Dict[str, Any]: Dictionary with university details.
         """
+        university_name = canonical_university_name(university_name)
         print(f"[{self.name}] Getting details for {university_name}...")
-        return get_university_details(university_name, student_languages)
+        return await aget_university_details(university_name, student_languages)
+
+    def run(self, university_name: str, student_languages: List[str]) -> Dict[str, Any]:
+        """Synchronous version of arun.
+
+        Args:
+            university_name (str): Name of the university.
+            student_languages (List[str]): List of languages the student knows.
+
+        Returns:
+            Dict[str, Any]: Dictionary with university details.
+        """
+        return run_coroutine(self.arun(university_name, student_languages))
+
+    async def aprepare(
+        self,
+        university_names: List[str],
+        max_concurrency: int,
+        timeout: float,
+        refresh: bool = False,
+    ) -> None:
+        """Generate the missing profiles of several universities in batched LLM calls.
+
+        Subsequent arun calls for these universities are then served from the profile store.
+
+        Args:
+            university_names (List[str]): Names of the universities.
+            max_concurrency (int): Maximum number of concurrent LLM calls.
+            timeout (float): Seconds allowed per LLM call.
+            refresh (bool, optional): Regenerate profiles even if fresh ones are stored.
+                Defaults to False.
+        """
+        names = [canonical_university_name(name) for name in university_names]
+        print(f"[{self.name}] Preparing profiles for {len(names)} universities...")
+        await aget_university_profiles(
+            names, max_concurrency=max_concurrency, timeout=timeout, refresh=refresh
+        )
+
+    async def aiter_batched(
+        self,
+        university_names: List[str],
+        student_languages: List[str],
+        max_concurrency: int,
+        timeout: float,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Get detailed information about several universities, generating missing profiles in batched LLM calls.
+
+        Details are yielded as soon as the batch of their university finishes. A
+        university that neither its batch nor its individual retry returned a
+        profile for gets the "Information unavailable" fallback.
+
+        Args:
+            university_names (List[str]): Names of the universities.
+            student_languages (List[str]): List of languages the student knows.
+            max_concurrency (int): Maximum number of concurrent LLM calls.
+            timeout (float): Seconds allowed per LLM call.
+
+        Yields:
+            Tuple[int, Dict[str, Any]]: The index of a university name and its details.
+        """
+        names = [canonical_university_name(name) for name in university_names]
+        print(f"[{self.name}] Getting details for {len(names)} universities in batches...")
+        async for index, profile in aiter_university_profiles(
+            names, max_concurrency=max_concurrency, timeout=timeout
+        ):
+            image = (await asyncio.to_thread(get_cached_university_image, names[index]))[0]
+            yield index, university_details(names[index], profile, student_languages, image)
+
+    def prepare(
+        self,
+        university_names: List[str],
+        max_workers: int,
+        timeout: float,
+        refresh: bool = False,
+    ) -> None:
+        """Synchronous version of aprepare, for the warmup.
+
+        Args:
+            university_names (List[str]): Names of the universities.
+            max_workers (int): Maximum number of concurrent LLM calls.
+            timeout (float): Seconds allowed per LLM call.
+            refresh (bool, optional): Regenerate profiles even if fresh ones are stored.
+                Defaults to False.
+        """
+        run_coroutine(self.aprepare(university_names, max_workers, timeout, refresh))
 
 
 class MultiAgentUniSearchSystem:
@@ -478,37 +1389,189 @@ class MultiAgentUniSearchSystem:
     Attributes:
         search_agent (SearchAgent): Agent for searching universities.
         detail_agent (DetailAgent): Agent for retrieving university details.
+        max_detail_workers (int): Maximum number of universities researched (or, with
+            batch_details, LLM calls made) concurrently.
+        detail_timeout (float): Seconds allowed per university (or, with batch_details,
+            per LLM call) before falling back.
+        batch_details (bool): Whether missing profiles are generated in batched calls.
     """
-    def __init__(self):
-        """Initialize the MultiAgentUniSearchSystem."""
+    def __init__(
+        self,
+        max_detail_workers: int = DETAIL_MAX_WORKERS,
+        detail_timeout: float = DETAIL_TIMEOUT,
+        batch_details: bool = True,
+    ):
+        """Initialize the MultiAgentUniSearchSystem.
+
+        Args:
+            max_detail_workers (int, optional): Maximum number of universities
+                researched (or, with batch_details, LLM calls made) concurrently.
+                Defaults to DETAIL_MAX_WORKERS.
+            detail_timeout (float, optional): Seconds allowed per university (or, with
+                batch_details, per LLM call) before falling back. Defaults to DETAIL_TIMEOUT.
+            batch_details (bool, optional): Generate missing profiles in batched LLM
+                calls of PROFILE_BATCH_SIZE universities instead of one call per
+                university. Defaults to True.
+        """
         self.search_agent = SearchAgent()
         self.detail_agent = DetailAgent()
+        self.max_detail_workers = max_detail_workers
+        self.detail_timeout = detail_timeout
+        self.batch_details = batch_details
 
-    def run(self, input_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def aiter_details(
+        self, university_names: List[str], student_languages: List[str]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Run the DetailAgent for all universities concurrently, yielding details as they finish.
+
+        With batch_details, missing profiles are generated in batched calls and the
+        universities of a batch are yielded as soon as it finishes. Otherwise every
+        university is researched on its own, and one whose details fail or exceed
+        the deadline degrades to the "Information unavailable" fallback instead of
+        blocking the others.
+
+        Args:
+            university_names (List[str]): Names of the universities.
+            student_languages (List[str]): List of languages the student knows.
+
+        Returns:
+            AsyncIterator[Tuple[int, Dict[str, Any]]]: The index of a university name
+                and its details, in completion order.
+        """
+        if self.batch_details:
+            return self.detail_agent.aiter_batched(
+                university_names, student_languages, self.max_detail_workers, self.detail_timeout
+            )
+        return aiter_with_deadlines(
+            lambda uni_name: self.detail_agent.arun(uni_name, student_languages),
+            university_names,
+            max_concurrency=self.max_detail_workers,
+            timeout=self.detail_timeout,
+            fallback=self._unavailable,
+        )
+
+    async def _unavailable(self, uni_name: str, error: Exception = None) -> Dict[str, Any]:
+        # Fallback details for a university that failed or timed out.
+        if error is None:
+            print(f"[{self.detail_agent.name}] Timed out getting details for {uni_name}")
+        else:
+            print(f"[{self.detail_agent.name}] Error getting details for {uni_name}: {str(error)}")
+        image = (await asyncio.to_thread(get_cached_university_image, uni_name))[0]
+        return unavailable_university_details(uni_name, image)
+
+    async def arun(self, input_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Run the multiagent system to search for partner universities and get details.
 
         Args:
             input_dict (Dict[str, Any]): Dictionary with input parameters.
 
         Returns:
-            List[Dict[str, Any]]: List of dictionaries with university details.
+            List[Dict[str, Any]]: List of dictionaries with university details, best
+                match for the student's criteria first.
         """
         print("Starting multiagent system...")
-        university_names = self.search_agent.run(input_dict)
+        university_names = await self.search_agent.arun(input_dict)
         if not university_names:
             print("No partner universities found to get details for")
             return []
-        results = []
-        for uni_name in university_names:
-            uni_details = self.detail_agent.run(uni_name, input_dict["languages"])
-            results.append(uni_details)
+        await asyncio.to_thread(prefetch_university_images, university_names)
+        results: List[Dict[str, Any]] = [None] * len(university_names)
+        async for index, details in self.aiter_details(university_names, input_dict["languages"]):
+            results[index] = details
+        results = rank_universities(results, input_dict)
         print(
             f"Multiagent system completed. Found details for {len(results)} universities"
         )
         return results
 
+    def run(self, input_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Synchronous version of arun, for the command line.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary with input parameters.
 
-def search_partner_universities(input_dict: dict) -> List[dict]:
+        Returns:
+            List[Dict[str, Any]]: List of dictionaries with university details, best
+                match for the student's criteria first.
+        """
+        return run_coroutine(self.arun(input_dict))
+
+    async def arun_stream(self, input_dict: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Run the multiagent system, yielding events as soon as they are available.
+
+        Events are dictionaries with an "event" key:
+            - "progress": A search or detail stage message, with "stage" and "message".
+            - "result": The details of one university (including its "match_score"),
+              with "index" and "university".
+            - "error": The search stage failed, with "message".
+            - "done": All universities were processed, with "count" and "ranking",
+              the result indices ordered from best to worst match.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary with input parameters.
+
+        Yields:
+            Dict[str, Any]: Progress, result, error and completion events.
+        """
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def search():
+            try:
+                names = await self.search_agent.arun(
+                    input_dict, on_progress=lambda m: messages.put_nowait(("progress", m))
+                )
+                messages.put_nowait(("done", names))
+            except Exception as e:
+                messages.put_nowait(("error", e))
+
+        search_task = asyncio.ensure_future(search())
+        try:
+            while True:
+                kind, payload = await messages.get()
+                if kind == "progress":
+                    yield {"event": "progress", "stage": "search", "message": payload}
+                elif kind == "error":
+                    print(f"Error searching for partner universities: {str(payload)}")
+                    yield {"event": "error", "message": str(payload)}
+                    return
+                else:
+                    university_names = payload
+                    break
+        finally:
+            search_task.cancel()
+
+        if not university_names:
+            yield {"event": "done", "count": 0, "ranking": []}
+            return
+
+        yield {
+            "event": "progress",
+            "stage": "details",
+            "message": f"Getting details for {len(university_names)} universities",
+            "universities": university_names,
+        }
+        await asyncio.to_thread(prefetch_university_images, university_names)
+        scores = [0.0] * len(university_names)
+        async for index, details in self.aiter_details(university_names, input_dict["languages"]):
+            scores[index] = round(float(score_universities([details], input_dict)[0]), 3)
+            details = {**details, "match_score": scores[index]}
+            yield {"event": "result", "index": index, "university": details}
+        ranking = sorted(range(len(scores)), key=lambda i: -scores[i])
+        yield {"event": "done", "count": len(university_names), "ranking": ranking}
+
+    def run_stream(self, input_dict: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Synchronous version of arun_stream, for the command line.
+
+        Args:
+            input_dict (Dict[str, Any]): Dictionary with input parameters.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Progress, result, error and completion events.
+        """
+        return iterate_async(self.arun_stream(input_dict))
+
+
+async def asearch_partner_universities(input_dict: dict) -> List[dict]:
     """Search for partner universities based on input criteria and return filtered results.
 
     Args:
@@ -519,7 +1582,47 @@ def search_partner_universities(input_dict: dict) -> List[dict]:
             description, image URL, student count, ranking, and languages.
     """
     multiagent_system = MultiAgentUniSearchSystem()
-    return multiagent_system.run(input_dict)
+    return await multiagent_system.arun(input_dict)
+
+
+def astream_partner_universities(input_dict: dict) -> AsyncIterator[dict]:
+    """Search for partner universities, yielding each university as soon as its details are ready.
+
+    Args:
+        input_dict (dict): Dictionary with search criteria.
+
+    Returns:
+        AsyncIterator[dict]: Progress, result and completion events as described in
+            MultiAgentUniSearchSystem.arun_stream.
+    """
+    multiagent_system = MultiAgentUniSearchSystem()
+    return multiagent_system.arun_stream(input_dict)
+
+
+def search_partner_universities(input_dict: dict) -> List[dict]:
+    """Synchronous version of asearch_partner_universities, for the command line.
+
+    Args:
+        input_dict (dict): Dictionary with search criteria.
+
+    Returns:
+        List[dict]: List of dictionaries with university information including title,
+            description, image URL, student count, ranking, and languages.
+    """
+    return run_coroutine(asearch_partner_universities(input_dict))
+
+
+def stream_partner_universities(input_dict: dict) -> Iterator[dict]:
+    """Synchronous version of astream_partner_universities, for the command line.
+
+    Args:
+        input_dict (dict): Dictionary with search criteria.
+
+    Returns:
+        Iterator[dict]: Progress, result and completion events as described in
+            MultiAgentUniSearchSystem.arun_stream.
+    """
+    return iterate_async(astream_partner_universities(input_dict))
 
 
 if __name__ == "__main__":
@@ -539,6 +1642,7 @@ if __name__ == "__main__":
             print(f"  Student Count: {uni['student_count']}")
             print(f"  Ranking: {uni['ranking']}")
             print(f"  Languages: {', '.join(uni['languages'])}")
+            print(f"  Match Score: {uni['match_score']}")
             print(f"  Image URL: {uni['image']}")
     else:
         print("No matching partner universities found.")
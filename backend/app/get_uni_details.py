@@ -1,33 +1,30 @@
-from typing import List
+import asyncio
+import json
+from typing import List, Optional
+from urllib.parse import urlsplit
 from attr import dataclass
-from find_unis import SearchResult, google, scrape_text_from_url
+from find_unis import SearchResult, agoogle
 from langchain.prompts import ChatPromptTemplate
 from tools import llm
+from tools.cache import PersistentCache
+from tools.concurrency import run_coroutine
+from tools.fetcher import ascrape_text_from_url
+from tools.gazetteer import gazetteer
+from tools.names import (
+    canonical_university_key,
+    canonical_university_name,
+    normalize_university_name,
+)
+from tools.page_store import page_store
+from tools.usage import llm_caller
 
+MAX_QUOTE_SITES = 2  # blog posts quotes are extracted from
+MIN_BLOG_TEXT_LENGTH = 200  # shorter pages are skipped
+QUOTES_TTL = 14 * 24 * 60 * 60
+QUOTES_EMPTY_TTL = 60 * 60  # no quotes usually means a failed search; retry sooner
+QUOTES_FALLBACK_TTL = 60 * 60  # quotes from stored pages after a failed search; retry sooner
 
-@dataclass
-class Quote:
-    """Represents a quote or excerpt from a university experience blog post.
-
-    Attributes:
-        quote (str): The exact text of the quote or excerpt.
-        source_link (str): The URL of the blog post where the quote was found.
-    """
-    quote: str
-    source_link: str
-
-
-def get_quotes_from_blog(text: str, link: str) -> List[Quote]:
-    """Extract interesting quotes from a blog post about university experiences.
-
-    Args:
-        text (str): The text content of the blog post.
-        link (str): The URL of the blog post.
-
-    Returns:
-        List[Quote]: A list of Quote objects containing interesting excerpts from the blog post.
-    """
-    template = """
+QUOTES_TEMPLATE = """
     Extract the 3-5 most interesting quotes or excerpts from this blog post about university experiences.
     Focus on quotes that discuss:
     - Student experiences at the university
@@ -54,18 +51,53 @@ def get_quotes_from_blog(text: str, link: str) -> List[Quote]:
     Return only valid JSON without additional text or explanation.
     """
 
-    prompt = ChatPromptTemplate.from_template(template)
+
+@dataclass
+class Quote:
+    """Represents a quote or excerpt from a university experience blog post.
+
+    Attributes:
+        quote (str): The exact text of the quote or excerpt.
+        source_link (str): The URL of the blog post where the quote was found.
+    """
+    quote: str
+    source_link: str
+
+
+@llm_caller("get_quotes_from_blog")
+async def aget_quotes_from_blog(text: str, link: str) -> List[Quote]:
+    """Extract interesting quotes from a blog post about university experiences.
+
+    Args:
+        text (str): The text content of the blog post.
+        link (str): The URL of the blog post.
+
+    Returns:
+        List[Quote]: A list of Quote objects containing interesting excerpts from the blog post.
+    """
+    prompt = ChatPromptTemplate.from_template(QUOTES_TEMPLATE)
     chain = prompt | llm
 
     try:
-        result = chain.invoke({"text": text})
+        result = await chain.ainvoke({"text": text})
     except Exception as e:
         print(f"LLM error while processing quotes: {e}")
         return []
+    return parse_quotes(result.content, link)
+
+
+def parse_quotes(content: str, link: str) -> List[Quote]:
+    """Parse the JSON array of quotes returned by the LLM.
+
+    Args:
+        content (str): The LLM response.
+        link (str): The URL of the blog post.
 
-    import json
+    Returns:
+        List[Quote]: The quotes, or an empty list if the response is not valid JSON.
+    """
     try:
-        response_text = result.content.strip()
+        response_text = content.strip()
         if "```" in response_text:
             response_text = response_text.split("```")[1]
             if response_text.startswith("json"):
@@ -86,13 +118,135 @@ class UniversityDetails:
 
     Attributes:
         quotes (List[Quote]): A list of quotes or excerpts related to the university.
+        from_stored_pages (bool): Whether the quotes come from previously fetched
+            pages because the web search failed.
     """
     quotes: List[Quote]
+    from_stored_pages: bool = False
+
 
+# Student quotes by canonical university key
+university_quotes = PersistentCache("university_quotes", ttl=QUOTES_TTL)
 
-def get_uni_details(university_name: str) -> UniversityDetails:
+
+def cached_uni_details(university_name: str) -> Optional[UniversityDetails]:
+    """Look up the stored quotes of a university without searching for them.
+
+    Args:
+        university_name (str): The name of the university.
+
+    Returns:
+        Optional[UniversityDetails]: The stored details, or None if none are stored.
+    """
+    quotes = university_quotes.get(canonical_university_key(university_name))
+    if quotes is None:
+        return None
+    return UniversityDetails(quotes=[Quote(**quote) for quote in quotes])
+
+
+def store_uni_details(university_name: str, details: UniversityDetails) -> None:
+    """Store the quotes of a university for QUOTES_TTL.
+
+    Quotes from stored pages are kept for QUOTES_FALLBACK_TTL only, and an empty
+    result for QUOTES_EMPTY_TTL, so that the next request searches again soon.
+
+    Args:
+        university_name (str): The name of the university.
+        details (UniversityDetails): The details to store.
+    """
+    university_quotes.set(
+        canonical_university_key(university_name),
+        [{"quote": quote.quote, "source_link": quote.source_link} for quote in details.quotes],
+        ttl=(
+            QUOTES_EMPTY_TTL if not details.quotes
+            else QUOTES_FALLBACK_TTL if details.from_stored_pages
+            else QUOTES_TTL
+        ),
+    )
+
+
+def is_university_page(university_name: str, url: str, text: str) -> bool:
+    """Check whether a page belongs to or is about a university.
+
+    Args:
+        university_name (str): The name of the university.
+        url (str): The page URL.
+        text (str): Text of the page, e.g. one of its chunks.
+
+    Returns:
+        bool: True if the page is on the university's gazetteer domain or one of its
+            subdomains, or if the text contains one of its known names.
+    """
+    entry = gazetteer.lookup(university_name) or {}
+    domain = (entry.get("domain") or "").lower()
+    host = (urlsplit(url).hostname or "").lower()
+    if domain and (host == domain or host.endswith("." + domain)):
+        return True
+
+    names = {university_name, canonical_university_name(university_name)}
+    names.update([entry["name"], *entry.get("aliases", [])] if entry else [])
+    normalized_text = f" {normalize_university_name(text)} "
+    return any(
+        f" {normalize_university_name(name)} " in normalized_text
+        for name in names if normalize_university_name(name)
+    )
+
+
+def stored_search_results(
+    university_name: str, query: str, max_results: int = 5
+) -> List[SearchResult]:
+    """Find stored pages about a university that are relevant to a query.
+
+    Only pages that is_university_page accepts are returned, since the store holds
+    the pages of every university.
+
+    Args:
+        university_name (str): The name of the university.
+        query (str): The search query.
+        max_results (int, optional): Maximum number of pages to return. Defaults to 5.
+
+    Returns:
+        List[SearchResult]: One result per page, with its best matching chunk as
+            snippet; empty if no stored page is about the university.
+    """
+    results: List[SearchResult] = []
+    for _, url, chunk in page_store.search(query, k=20 * max_results):
+        if len(results) >= max_results:
+            break
+        if any(result.url == url for result in results):
+            continue
+        if not is_university_page(university_name, url, chunk):
+            continue
+        results.append(SearchResult(title=url, url=url, snippet=chunk))
+    return results
+
+
+async def aget_uni_details(university_name: str, refresh: bool = False) -> UniversityDetails:
+    """Return the stored quotes of a university, searching for them on a miss.
+
+    Args:
+        university_name (str): The name of the university to search for.
+        refresh (bool, optional): Search again even if quotes are stored. Defaults to False.
+
+    Returns:
+        UniversityDetails: An object containing a list of quotes about student experiences at the university.
+    """
+    if not refresh:
+        details = await asyncio.to_thread(cached_uni_details, university_name)
+        if details is not None:
+            return details
+    details = await asearch_uni_details(university_name)
+    await asyncio.to_thread(store_uni_details, university_name, details)
+    return details
+
+
+async def asearch_uni_details(university_name: str) -> UniversityDetails:
     """Retrieve detailed information about a university by searching, scraping, and analyzing relevant blog posts.
 
+    Search results are scraped MAX_QUOTE_SITES at a time until enough usable blog
+    posts are found, and their quotes are extracted concurrently. If the search
+    fails, stored pages about the university are used instead.
+
     Args:
         university_name (str): The name of the university to search for.
 
@@ -100,42 +254,51 @@ def get_uni_details(university_name: str) -> UniversityDetails:
         UniversityDetails: An object containing a list of quotes about student experiences at the university.
     """
     query = f"{university_name} student experience blog article post"
-    all_quotes = []
 
+    from_stored_pages = False
     try:
-        search_results: List[SearchResult] = google(query)
+        search_results: List[SearchResult] = await agoogle(query)
     except Exception as e:
         print(f"Error during Google search for '{query}': {e}")
+        search_results = await asyncio.to_thread(stored_search_results, university_name, query)
+        from_stored_pages = True
 
-    sites_processed = 0
-    for result in search_results:
-        if sites_processed >= 2:
+    async def scrape(url: str) -> Optional[str]:
+        try:
+            text = await ascrape_text_from_url(url)
+        except Exception as e:
+            print(f"Error processing URL {url}: {e}")
+            return None
+        return text if text and len(text) >= MIN_BLOG_TEXT_LENGTH else None
+
+    urls = [result.url for result in search_results if getattr(result, "url", None)]
+    sites = []
+    for start in range(0, len(urls), MAX_QUOTE_SITES):
+        if len(sites) >= MAX_QUOTE_SITES:
             break
+        window = urls[start:start + MAX_QUOTE_SITES]
+        texts = await asyncio.gather(*(scrape(url) for url in window))
+        sites.extend((url, text) for url, text in zip(window, texts) if text is not None)
+    sites = sites[:MAX_QUOTE_SITES]
 
-        try:
-            if not hasattr(result, "url") or not result.url:
-                continue
-            scraped_text = scrape_text_from_url(result.url)
-
-            if not scraped_text or len(scraped_text) < 200:
-                continue
-            sites_processed += 1
-
-            if (
-                "experience" in query.lower()
-                or "stories" in query.lower()
-                or "life" in query.lower()
-            ):
-                quotes = get_quotes_from_blog(scraped_text, result.url)
-                all_quotes.extend(quotes)
+    quotes = await asyncio.gather(*(aget_quotes_from_blog(text, url) for url, text in sites))
+    return UniversityDetails(
+        quotes=[quote for site_quotes in quotes for quote in site_quotes],
+        from_stored_pages=from_stored_pages,
+    )
 
-        except Exception as e:
-            print(
-                f"Error processing URL {result.url if hasattr(result, 'url') else 'unknown'}: {e}"
-            )
-            continue
 
-    return UniversityDetails(quotes=all_quotes)
+def get_uni_details(university_name: str, refresh: bool = False) -> UniversityDetails:
+    """Synchronous version of aget_uni_details, for the command line and the warmup.
+
+    Args:
+        university_name (str): The name of the university to search for.
+        refresh (bool, optional): Search again even if quotes are stored. Defaults to False.
+
+    Returns:
+        UniversityDetails: An object containing a list of quotes about student experiences at the university.
+    """
+    return run_coroutine(aget_uni_details(university_name, refresh))
 
 
 if __name__ == "__main__":
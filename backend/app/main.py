@@ -1,13 +1,51 @@
-from typing import List, Optional, Union
-from find_unis import search_partner_universities
-from get_uni_details import get_uni_details
+import asyncio
+import json
+import os
+import secrets
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from find_unis import (
+    asearch_partner_universities,
+    astream_partner_universities,
+    get_cached_university_image,
+    invalidate_partner_list,
+    prefetch_university_images,
+    resolve_university_image,
+)
+from get_uni_details import aget_uni_details
 from plan_application import (
-    make_markdown_from_plan,
-    plan_semester_abroad_application,
+    aget_application_plan,
+    amake_markdown_from_plan,
 )
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.routing import Match
+from tools.concurrency import AsyncRequestCoalescer
+from tools.jobs import FINISHED, JobQueue
+from tools.names import canonical_university_key
+from tools.usage import usage_scope, usage_tracker
+
+# Seconds a finished response is shared with identical requests arriving later
+SEARCH_RESULT_TTL = 60
+DETAILS_RESULT_TTL = 10 * 60
+PLAN_RESULT_TTL = 10 * 60
+
+search_requests = AsyncRequestCoalescer(ttl=SEARCH_RESULT_TTL)
+details_requests = AsyncRequestCoalescer(ttl=DETAILS_RESULT_TTL)
+plan_requests = AsyncRequestCoalescer(ttl=PLAN_RESULT_TTL)
+
+# Token required by administrative endpoints; they are disabled if it is not set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+PLAN_JOB_WORKERS = int(os.getenv("PLAN_JOB_WORKERS", "2"))  # plans generated concurrently
+# Requeue plan jobs left running by the last shutdown right away instead of after
+# their lease; only enable this when a single server process uses the job store
+PLAN_JOBS_REQUEUE_ON_STARTUP = os.getenv("PLAN_JOBS_REQUEUE_ON_STARTUP", "").lower() in (
+    "1", "true", "yes"
+)
+JOB_MAX_WAIT = 30  # longest a job status request may wait for a change, in seconds
+JOB_EVENT_TIMEOUT = 15  # seconds between status lines of an unchanged streamed job
 
 
 app = FastAPI()
@@ -20,6 +58,49 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def track_llm_usage(request: Request, call_next):
+    """Attribute LLM usage to the matched endpoint and a per-request id.
+
+    The request id is returned in the X-Request-ID header and can be used with
+    /usage/requests/{request_id}.
+    """
+    endpoint = request.url.path
+    for route in app.router.routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            endpoint = route.path
+            break
+    with usage_scope(endpoint, request.headers.get("X-Request-ID")) as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+def canonical_request_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Build a key shared by requests that produce the same response.
+
+    Strings are compared case- and whitespace-insensitively and lists regardless
+    of order; callers pass university names through canonical_university_key.
+
+    Args:
+        endpoint (str): The endpoint path.
+        params (Dict[str, Any]): The request parameters.
+
+    Returns:
+        str: The request key.
+    """
+    def normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        if isinstance(value, (list, tuple)):
+            return sorted((normalize(item) for item in value), key=json.dumps)
+        return value
+
+    return endpoint + json.dumps(
+        {name: normalize(value) for name, value in params.items()}, sort_keys=True
+    )
+
+
 class UniversitySearchInput(BaseModel):
     """Input model for searching partner universities.
 
@@ -28,7 +109,7 @@ class UniversitySearchInput(BaseModel):
         major (str): Student's major.
         gpa (float): Student's GPA (grade point average).
         languages (List[str]): List of languages the student speaks.
-        budget (Optional[float]): Optional monthly or total budget.
+        budget (Optional[float]): Optional monthly budget in EUR.
         start_month (Optional[int]): Optional start month for the exchange.
         start_year (Optional[int]): Optional start year for the exchange.
         end_month (Optional[int]): Optional end month for the exchange.
@@ -56,6 +137,8 @@ class UniversityResult(BaseModel):
         student_count (int): Number of students at the university.
         ranking (str): Ranking category (e.g., high, mid, low).
         languages (List[str]): Languages of instruction.
+        match_score (Optional[float]): How well the university matches the student's
+            criteria, from 0 to 1. Results are sorted by this score.
     """
 
     title: str
@@ -64,6 +147,45 @@ class UniversityResult(BaseModel):
     student_count: int
     ranking: str
     languages: List[str]
+    match_score: Optional[float] = None
+
+
+class LLMUsageSummary(BaseModel):
+    """Aggregated LLM usage of one group of calls.
+
+    Attributes:
+        calls (int): Number of LLM calls.
+        errors (int): Number of failed LLM calls.
+        prompt_tokens (int): Prompt tokens used.
+        completion_tokens (int): Completion tokens used.
+        total_tokens (int): Prompt and completion tokens used.
+        cost (float): Estimated cost in USD.
+        total_latency (float): Summed latency in seconds.
+        avg_latency (float): Average latency per call in seconds.
+    """
+
+    calls: int
+    errors: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cost: float
+    total_latency: float
+    avg_latency: float
+
+
+class UniversityImageResponse(BaseModel):
+    """Response model for a university's campus image.
+
+    Attributes:
+        title (str): University name.
+        image (Optional[str]): Image URL, if one was found.
+        pending (bool): Whether the image is still being resolved.
+    """
+
+    title: str
+    image: Optional[str] = None
+    pending: bool
 
 
 class QuoteModel(BaseModel):
@@ -114,10 +236,35 @@ class ApplicationPlanResponse(BaseModel):
     markdown: str
 
 
+class ApplicationPlanJobResponse(BaseModel):
+    """Response model for a background application plan job.
+
+    Attributes:
+        job_id (str): The job id.
+        status (str): "queued", "running", "succeeded" or "failed".
+        created_at (float): When the job was submitted, as a Unix timestamp.
+        started_at (Optional[float]): When the job last started running.
+        finished_at (Optional[float]): When the job finished.
+        result (Optional[ApplicationPlanResponse]): The plan, once the job succeeded.
+        error (Optional[str]): The error, if the job failed.
+    """
+
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ApplicationPlanResponse] = None
+    error: Optional[str] = None
+
+
 @app.post("/search_universities", response_model=List[UniversityResult])
-def search_universities(input_data: UniversitySearchInput):
+async def search_universities(input_data: UniversitySearchInput):
     """Search for partner universities based on the provided criteria.
 
+    Identical searches running at the same time share one pipeline run, and its
+    result is reused for SEARCH_RESULT_TTL seconds.
+
     Args:
         input_data (UniversitySearchInput): Search criteria including university, major, GPA, languages, etc.
 
@@ -126,23 +273,121 @@ def search_universities(input_data: UniversitySearchInput):
             description, image, student count, ranking, and supported languages.
     """
     input_dict = input_data.dict()
-    results = search_partner_universities(input_dict)
+    key = canonical_request_key(
+        "/search_universities",
+        {**input_dict, "university": canonical_university_key(input_data.university)},
+    )
+    results = await search_requests.do(key, lambda: asearch_partner_universities(input_dict))
     return results
 
 
+@app.post("/search_universities/stream")
+async def search_universities_stream(input_data: UniversitySearchInput):
+    """Search for partner universities, streaming each result as soon as it is ready.
+
+    The response is newline-delimited JSON. Each line is an event object with an
+    "event" key: "progress" (search and detail stage messages), "result" (one
+    UniversityResult under "university"), "error" or "done".
+
+    Args:
+        input_data (UniversitySearchInput): Search criteria including university, major, GPA, languages, etc.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson stream of events.
+    """
+    input_dict = input_data.dict()
+
+    async def events() -> AsyncIterator[str]:
+        async for event in astream_partner_universities(input_dict):
+            if event["event"] == "result":
+                event["university"] = UniversityResult(**event["university"]).dict()
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def require_admin(token: Optional[str]) -> None:
+    """Reject requests to administrative endpoints without the admin token.
+
+    Args:
+        token (Optional[str]): The X-Admin-Token header of the request.
+
+    Raises:
+        HTTPException: 404 if ADMIN_TOKEN is not configured, 403 if the token is wrong.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.delete("/partner_universities_cache")
+def delete_partner_universities_cache(
+    university: str, major: str, x_admin_token: Optional[str] = Header(None)
+):
+    """Invalidate the cached partner list of a home university and major.
+
+    Requires the ADMIN_TOKEN in the X-Admin-Token header.
+
+    Args:
+        university (str): Name of the student's home university.
+        major (str): Student's major.
+        x_admin_token (Optional[str], optional): The admin token. Defaults to None.
+
+    Returns:
+        dict: Confirmation of the invalidated entry.
+    """
+    require_admin(x_admin_token)
+    invalidate_partner_list(university, major)
+    return {"university": university, "major": major, "invalidated": True}
+
+
+@app.get("/university_image/{university_name}", response_model=UniversityImageResponse)
+async def university_image(university_name: str, wait: bool = False):
+    """Get the campus image of a university.
+
+    Search results are returned before their images are resolved; clients use this
+    endpoint to fill in missing images later.
+
+    Args:
+        university_name (str): The name of the university.
+        wait (bool, optional): Block until the image is resolved. Defaults to False.
+
+    Returns:
+        UniversityImageResponse: The image URL and whether it is still pending.
+    """
+    if wait:
+        try:
+            image = await asyncio.to_thread(resolve_university_image, university_name)
+        except Exception as e:
+            print(f"Error searching for image: {str(e)}")
+            return UniversityImageResponse(title=university_name, image=None, pending=True)
+        return UniversityImageResponse(title=university_name, image=image, pending=False)
+    image, resolved = await asyncio.to_thread(get_cached_university_image, university_name)
+    if not resolved:
+        await asyncio.to_thread(prefetch_university_images, [university_name])
+    return UniversityImageResponse(title=university_name, image=image, pending=not resolved)
+
+
 @app.get(
     "/university_details/{university_name}", response_model=UniversityDetailsResponse
 )
-def university_details(university_name: str):
+async def university_details(university_name: str):
     """Get detailed information about a university, including student quotes.
 
+    Identical requests running at the same time share one lookup, and its result
+    is reused for DETAILS_RESULT_TTL seconds.
+
     Args:
         university_name (str): The name of the university to get details for.
 
     Returns:
         UniversityDetailsResponse: Object with a list of student quotes.
     """
-    details = get_uni_details(university_name)
+    key = canonical_request_key(
+        "/university_details", {"university": canonical_university_key(university_name)}
+    )
+    details = await details_requests.do(key, lambda: aget_uni_details(university_name))
     return UniversityDetailsResponse(
         quotes=[
             QuoteModel(quote=q.quote, source_link=q.source_link) for q in details.quotes
@@ -151,20 +396,204 @@ def university_details(university_name: str):
 
 
 @app.post("/application_plan", response_model=ApplicationPlanResponse)
-def create_application_plan(input_data: ApplicationPlanInput):
+async def create_application_plan(input_data: ApplicationPlanInput):
     """Create a semester abroad application plan with both raw text and markdown formats.
 
+    Identical requests running at the same time share one planning run, and its
+    result is reused for PLAN_RESULT_TTL seconds.
+    Planning takes tens of seconds; clients that cannot hold a request open that
+    long submit a job to /application_plan/jobs instead.
+
     Args:
         input_data (ApplicationPlanInput): Contains home_university, target_university, and major.
 
     Returns:
         ApplicationPlanResponse: JSON object with both raw plan text and markdown-formatted plan.
     """
-    plan = plan_semester_abroad_application(
-        home_university=input_data.home_university,
-        target_university=input_data.target_university,
-        major=input_data.major,
+    async def create_plan() -> ApplicationPlanResponse:
+        plan = await aget_application_plan(
+            home_university=input_data.home_university,
+            target_university=input_data.target_university,
+            major=input_data.major,
+        )
+        markdown_plan = await amake_markdown_from_plan(plan)
+        return ApplicationPlanResponse(plan=plan, markdown=markdown_plan)
+
+    key = canonical_request_key(
+        "/application_plan",
+        {
+            "home_university": canonical_university_key(input_data.home_university),
+            "target_university": canonical_university_key(input_data.target_university),
+            "major": input_data.major,
+        },
+    )
+    return await plan_requests.do(key, create_plan)
+
+
+async def run_application_plan_job(params: Dict[str, Any]) -> Dict[str, str]:
+    """Create the application plan of a background job.
+
+    Args:
+        params (Dict[str, Any]): The fields of an ApplicationPlanInput.
+
+    Returns:
+        Dict[str, str]: The fields of an ApplicationPlanResponse.
+    """
+    plan = await aget_application_plan(
+        home_university=params["home_university"],
+        target_university=params["target_university"],
+        major=params["major"],
+    )
+    markdown_plan = await amake_markdown_from_plan(plan)
+    return {"plan": plan, "markdown": markdown_plan}
+
+
+plan_jobs = JobQueue(
+    "/application_plan/jobs", run_application_plan_job, workers=PLAN_JOB_WORKERS
+)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start the background job workers.
+
+    Jobs interrupted by the last shutdown are resumed once their lease expires, or
+    right away if PLAN_JOBS_REQUEUE_ON_STARTUP is set.
+    """
+    await plan_jobs.start(requeue_unfinished=PLAN_JOBS_REQUEUE_ON_STARTUP)
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """Stop the background job workers."""
+    await plan_jobs.stop()
+
+
+def application_plan_job_response(job: Dict[str, Any]) -> ApplicationPlanJobResponse:
+    """Convert a stored job to its API response.
+
+    Args:
+        job (Dict[str, Any]): The job, as returned by JobQueue.get.
+
+    Returns:
+        ApplicationPlanJobResponse: The job status and, if finished, its result or error.
+    """
+    return ApplicationPlanJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        result=None if job["result"] is None else ApplicationPlanResponse(**job["result"]),
+        error=job["error"],
     )
 
-    markdown_plan = make_markdown_from_plan(plan)
-    return ApplicationPlanResponse(plan=plan, markdown=markdown_plan)
+
+@app.post(
+    "/application_plan/jobs", response_model=ApplicationPlanJobResponse, status_code=202
+)
+async def submit_application_plan_job(input_data: ApplicationPlanInput):
+    """Submit the creation of an application plan as a background job.
+
+    Jobs are kept in a local database and run by a pool of PLAN_JOB_WORKERS workers,
+    so they survive client reconnects and server restarts. Submitting a plan that is
+    already queued or running returns the existing job. The LLM usage of a job is
+    reported under its id at /usage/requests/{job_id}.
+
+    Args:
+        input_data (ApplicationPlanInput): Contains home_university, target_university, and major.
+
+    Returns:
+        ApplicationPlanJobResponse: The queued job; poll /application_plan/jobs/{job_id}
+            or stream /application_plan/jobs/{job_id}/events for its result.
+    """
+    key = canonical_request_key(
+        "/application_plan",
+        {
+            "home_university": canonical_university_key(input_data.home_university),
+            "target_university": canonical_university_key(input_data.target_university),
+            "major": input_data.major,
+        },
+    )
+    job = await plan_jobs.submit(input_data.dict(), key=key)
+    return application_plan_job_response(job)
+
+
+@app.get("/application_plan/jobs/{job_id}", response_model=ApplicationPlanJobResponse)
+async def application_plan_job(job_id: str, wait: float = 0):
+    """Get the status and, once finished, the result of an application plan job.
+
+    Args:
+        job_id (str): The id returned when the job was submitted.
+        wait (float, optional): Seconds to wait for the job to finish before
+            answering (long polling), at most JOB_MAX_WAIT. Defaults to 0.
+
+    Returns:
+        ApplicationPlanJobResponse: The job status and, if finished, its result or error.
+    """
+    if wait > 0:
+        job = await plan_jobs.wait(job_id, min(wait, JOB_MAX_WAIT))
+    else:
+        job = await plan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return application_plan_job_response(job)
+
+
+@app.get("/application_plan/jobs/{job_id}/events")
+async def application_plan_job_events(job_id: str):
+    """Stream the status of an application plan job until it finishes.
+
+    The response is newline-delimited JSON. Each line is an ApplicationPlanJobResponse,
+    sent when the status changes and at least every JOB_EVENT_TIMEOUT seconds; the
+    stream ends with the finished job. Clients that lose the connection can
+    subscribe again.
+
+    Args:
+        job_id (str): The id returned when the job was submitted.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson stream of job statuses.
+    """
+    job = await plan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def events() -> AsyncIterator[str]:
+        current = job
+        while True:
+            yield json.dumps(application_plan_job_response(current).dict()) + "\n"
+            if current["status"] in FINISHED:
+                return
+            current = await plan_jobs.wait(job_id, JOB_EVENT_TIMEOUT, status=current["status"])
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/usage", response_model=Dict[str, LLMUsageSummary])
+def llm_usage(group_by: str = "endpoint"):
+    """Get aggregated token, cost and latency figures of recent LLM calls.
+
+    Args:
+        group_by (str, optional): "endpoint", "caller", "request_id", "deployment" or
+            "model". Defaults to "endpoint".
+
+    Returns:
+        Dict[str, LLMUsageSummary]: Usage per group.
+    """
+    return usage_tracker.summarize(group_by=group_by)
+
+
+@app.get("/usage/requests/{request_id}", response_model=Dict[str, LLMUsageSummary])
+def llm_usage_for_request(request_id: str):
+    """Get the LLM usage of a single API request, per caller.
+
+    Args:
+        request_id (str): The id returned in the X-Request-ID response header.
+
+    Returns:
+        Dict[str, LLMUsageSummary]: Usage per caller.
+    """
+    return usage_tracker.summarize(group_by="caller", request_id=request_id)
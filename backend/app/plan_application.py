@@ -1,43 +1,84 @@
+import asyncio
 from typing import Dict
-from langchain.agents import initialize_agent
+from langchain.agents import AgentExecutor, initialize_agent
 from langchain.agents.agent_types import AgentType
 from langchain.prompts import ChatPromptTemplate
 from tools import content_analysis_tool, google_search_tool, llm
+from tools.names import canonical_university_key
+from tools.semantic_cache import SemanticCache, similarity_threshold
+from tools.usage import llm_caller
 
+PLAN_MAX_EXECUTION_TIME = 8  # seconds the research agent may spend on a plan
+REVIEW_MAX_EXECUTION_TIME = 4  # seconds the reviewer agent may spend on a plan
+PLAN_TTL = 30 * 24 * 60 * 60
+# Major similarity for reusing a plan, per embedding backend. With HashingEmbeddings
+# only case, punctuation and word order variants of the same major reach 0.95, while
+# related majors such as "Mathematics" and "Mathematics Education" score about 0.82
+# and must not share a plan. The deployment default only admits near-identical
+# phrasings; tune it for the model with the PLAN_SIMILARITY_THRESHOLD variable.
+PLAN_SIMILARITY_THRESHOLD = similarity_threshold(
+    "PLAN_SIMILARITY_THRESHOLD", hashing=0.95, deployment=0.99
+)
 
-def review_plan(
-    plan: str, home_university: str, target_university: str, major: str
-) -> Dict:
-    """Reviews and improves a semester abroad application plan.
+MARKDOWN_TEMPLATE = """
+    You are an expert Markdown writer. Convert the following study abroad application plan into a 
+    well-organized, visually appealing Markdown document. The Markdown should:
+    
+    1. Have a clean, professional structure
+    2. Include appropriate sections with headings
+    3. Use lists, tables, or emphasis where appropriate
+    4. Include a timeline or checklist section if possible
+    5. Use a readable, hierarchical layout
+    6. Utilize Markdown formatting features (bold, italic, headers, etc.)
+    
+    Here's the plan to convert:
+    {plan}
+    
+    Return ONLY the complete Markdown content.
+    """
+
+# Plans by (home university, target university), matched on the phrasing of the major.
+application_plans = SemanticCache(
+    "application_plans", ttl=PLAN_TTL, threshold=PLAN_SIMILARITY_THRESHOLD
+)
+
+
+def research_agent(max_execution_time: float) -> AgentExecutor:
+    """Creates an agent that can search the web and analyze pages.
 
     Args:
-        plan (str): The initial application plan to review.
-        home_university (str): Name of the student's home university.
-        target_university (str): Name of the target exchange university.
-        major (str): The student's academic major.
+        max_execution_time (float): Seconds after which the agent stops researching.
 
     Returns:
-        dict[str, Any]: Dictionary containing review feedback with keys:
-            - 'strengths': List of plan strengths
-            - 'improvements': List of suggested improvements
-            - 'missing_info': List of missing critical information
-            - 'deadline_check': Boolean indicating deadline validity
-
-    Notes:
-        Uses a reviewer agent with search capabilities to validate information.
+        AgentExecutor: The agent, with the Google search and content analysis tools.
     """
-    reviewer_agent = initialize_agent(
+    return initialize_agent(
         [google_search_tool, content_analysis_tool],
         llm,
         agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
         verbose=True,
-        max_execution_time=4,
+        max_execution_time=max_execution_time,
         early_stopping_method="generate",
     )
 
-    result = reviewer_agent.invoke(
-        {
-            "input": f"""
+
+def final_plan_agent() -> AgentExecutor:
+    """Creates the agent that merges a plan with its review, without tools.
+
+    Returns:
+        AgentExecutor: The agent.
+    """
+    return initialize_agent(
+        [],
+        llm,
+        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=True,
+    )
+
+
+def review_input(plan: str, home_university: str, target_university: str, major: str) -> str:
+    """Builds the reviewer agent's task."""
+    return f"""
         Review the following semester abroad application plan for a student from "{home_university}" 
         to "{target_university}" majoring in "{major}".
         
@@ -52,44 +93,11 @@ def review_plan(
         
         Format your review as constructive feedback with specific suggestions for improvement.
         """
-        }
-    )
-
-    return result["output"]
-
-
-def plan_semester_abroad_application(
-    home_university: str, target_university: str, major: str
-) -> Dict:
-    """Generates a comprehensive semester abroad application plan.
-
-    Args:
-        home_university (str): Name of the student's home institution.
-        target_university (str): Name of the target exchange university.
-        major (str): The student's academic major.
 
-    Returns:
-        dict[str, Any]: Structured application plan containing:
-            - 'timeline': Key dates and deadlines
-            - 'requirements': List of application requirements
-            - 'financial_plan': Cost breakdown and funding options
-            - 'academic_prep': Course mapping and credit transfer info
-            - 'housing_options': Available housing solutions
 
-    Note:
-        Combines automated research with LLM analysis for optimal results.
-    """
-    agent = initialize_agent(
-        [google_search_tool, content_analysis_tool],
-        llm,
-        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        verbose=True,
-        max_execution_time=8,
-        early_stopping_method="generate",
-    )
-    result = agent.invoke(
-        {
-            "input": f"""
+def plan_input(home_university: str, target_university: str, major: str) -> str:
+    """Builds the research agent's planning task."""
+    return f"""
             Create a brief plan for applying to a semester abroad program from "{home_university}" to "{target_university}" for a student majoring in "{major}".
             
             Possible topics to research and outline:
@@ -107,22 +115,11 @@ def plan_semester_abroad_application(
             Use university websites and official sources whenever possible. The plan should be brief, actionable, and organized well.
             Don't take into account too many websites, just focus on the most important ones.
             """
-        }
-    )
-    
-    plan_result = result["output"]
-    review_result = review_plan(plan_result, home_university, target_university, major)
-    
-    final_plan_agent = initialize_agent(
-        [],
-        llm,
-        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        verbose=True,
-    )
 
-    final_result = final_plan_agent.invoke(
-        {
-            "input": f"""
+
+def final_plan_input(plan_result: str, review_result: str) -> str:
+    """Builds the final plan agent's task."""
+    return f"""
         ORIGINAL PLAN:
         {plan_result}
         
@@ -132,13 +129,102 @@ def plan_semester_abroad_application(
         Create an improved final plan that addresses the review feedback while maintaining 
         the organization and clarity of the original plan.
         """
-        }
+
+
+@llm_caller("review_plan")
+async def areview_plan(
+    plan: str, home_university: str, target_university: str, major: str
+) -> Dict:
+    """Reviews and improves a semester abroad application plan.
+
+    Args:
+        plan (str): The initial application plan to review.
+        home_university (str): Name of the student's home university.
+        target_university (str): Name of the target exchange university.
+        major (str): The student's academic major.
+
+    Returns:
+        dict[str, Any]: Dictionary containing review feedback with keys:
+            - 'strengths': List of plan strengths
+            - 'improvements': List of suggested improvements
+            - 'missing_info': List of missing critical information
+            - 'deadline_check': Boolean indicating deadline validity
+
+    Notes:
+        Uses a reviewer agent with search capabilities to validate information.
+    """
+    reviewer_agent = research_agent(REVIEW_MAX_EXECUTION_TIME)
+    result = await reviewer_agent.ainvoke(
+        {"input": review_input(plan, home_university, target_university, major)}
+    )
+    return result["output"]
+
+
+@llm_caller("plan_semester_abroad_application")
+async def aplan_semester_abroad_application(
+    home_university: str, target_university: str, major: str
+) -> Dict:
+    """Generates a comprehensive semester abroad application plan.
+
+    Args:
+        home_university (str): Name of the student's home institution.
+        target_university (str): Name of the target exchange university.
+        major (str): The student's academic major.
+
+    Returns:
+        dict[str, Any]: Structured application plan containing:
+            - 'timeline': Key dates and deadlines
+            - 'requirements': List of application requirements
+            - 'financial_plan': Cost breakdown and funding options
+            - 'academic_prep': Course mapping and credit transfer info
+            - 'housing_options': Available housing solutions
+
+    Note:
+        Combines automated research with LLM analysis for optimal results.
+    """
+    agent = research_agent(PLAN_MAX_EXECUTION_TIME)
+    result = await agent.ainvoke(
+        {"input": plan_input(home_university, target_university, major)}
     )
 
+    plan_result = result["output"]
+    review_result = await areview_plan(plan_result, home_university, target_university, major)
+
+    final_result = await final_plan_agent().ainvoke(
+        {"input": final_plan_input(plan_result, review_result)}
+    )
     return final_result["output"]
 
 
-def make_markdown_from_plan(plan: str) -> str:
+async def aget_application_plan(
+    home_university: str, target_university: str, major: str, refresh: bool = False
+) -> str:
+    """Returns a stored plan for the university pair and a similar major, or creates one.
+
+    Args:
+        home_university (str): Name of the student's home institution.
+        target_university (str): Name of the target exchange university.
+        major (str): The student's academic major.
+        refresh (bool, optional): Create a new plan even if a similar one is stored.
+            Defaults to False.
+
+    Returns:
+        str: The application plan.
+    """
+    scope = f"{canonical_university_key(home_university)}|{canonical_university_key(target_university)}"
+    if not refresh:
+        plan = await asyncio.to_thread(application_plans.lookup, major, scope=scope)
+        if plan is not None:
+            return plan
+
+    plan = await aplan_semester_abroad_application(home_university, target_university, major)
+    if plan:
+        await asyncio.to_thread(application_plans.update, major, plan, scope=scope)
+    return plan
+
+
+@llm_caller("make_markdown_from_plan")
+async def amake_markdown_from_plan(plan: str) -> str:
     """Converts an application plan into a structured Markdown document.
 
     Args:
@@ -158,35 +244,21 @@ def make_markdown_from_plan(plan: str) -> str:
         ## 6 Months Before Departure
         - [ ] Submit initial paperwork...
     """
-    template = """
-    You are an expert Markdown writer. Convert the following study abroad application plan into a 
-    well-organized, visually appealing Markdown document. The Markdown should:
-    
-    1. Have a clean, professional structure
-    2. Include appropriate sections with headings
-    3. Use lists, tables, or emphasis where appropriate
-    4. Include a timeline or checklist section if possible
-    5. Use a readable, hierarchical layout
-    6. Utilize Markdown formatting features (bold, italic, headers, etc.)
-    
-    Here's the plan to convert:
-    {plan}
-    
-    Return ONLY the complete Markdown content.
-    """
-
-    prompt = ChatPromptTemplate.from_template(template)
+    prompt = ChatPromptTemplate.from_template(MARKDOWN_TEMPLATE)
     chain = prompt | llm
-    result = chain.invoke({"plan": plan})
+    result = await chain.ainvoke({"plan": plan})
     return result.content
 
 
 if __name__ == "__main__":
-    result = plan_semester_abroad_application(
-        "Muenster",
-        "UCSB",
-        "Computer Science",
-    )
-    print(result)
-    markdown_plan = make_markdown_from_plan(result)
-    print(markdown_plan)
+    async def main():
+        result = await aplan_semester_abroad_application(
+            "Muenster",
+            "UCSB",
+            "Computer Science",
+        )
+        print(result)
+        markdown_plan = await amake_markdown_from_plan(result)
+        print(markdown_plan)
+
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+CACHE_DB_PATH = os.getenv(
+    "CACHE_DB_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "cache.sqlite3",
+    ),
+)
+
+CACHE_EVICTION_INTERVAL = 100  # writes between size checks of caches with max_entries
+
+# Returned by PersistentCache.get when a key is absent or expired, so that cached
+# None values (e.g. recorded misses) can be told apart from cache misses.
+MISSING = object()
+
+_connections: Dict[str, sqlite3.Connection] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Return the shared connection for a cache database, creating it on first use.
+
+    Args:
+        path (str): Path of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: A connection shared by all caches using the same file.
+    """
+    with _registry_lock:
+        if path not in _connections:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            connection = sqlite3.connect(
+                path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(cache_entries)")}
+            if "accessed_at" not in columns:
+                connection.execute("ALTER TABLE cache_entries ADD COLUMN accessed_at REAL")
+            # Entries written before accessed_at existed; eviction orders by it alone.
+            connection.execute(
+                "UPDATE cache_entries SET accessed_at = created_at WHERE accessed_at IS NULL"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed "
+                "ON cache_entries (namespace, accessed_at)"
+            )
+            _connections[path] = connection
+            _locks[path] = threading.Lock()
+        return _connections[path]
+
+
+class PersistentCache:
+    """A namespaced key-value cache persisted in a local SQLite database.
+
+    Values are stored as JSON. Entries older than their TTL are treated as missing,
+    so the next lookup refreshes them. Caches with ``max_entries`` evict their least
+    recently used entries once they grow beyond that size; the size is checked
+    every CACHE_EVICTION_INTERVAL writes, so it may exceed ``max_entries`` by that
+    many entries in between.
+
+    Attributes:
+        namespace (str): Name separating this cache's entries from other caches.
+        ttl (Optional[float]): Default lifetime of an entry in seconds, or None for no expiry.
+        path (str): Path of the SQLite database file.
+        max_entries (Optional[int]): Maximum number of entries kept, or None for no limit.
+    """
+    def __init__(
+        self,
+        namespace: str,
+        ttl: Optional[float] = None,
+        path: str = None,
+        max_entries: Optional[int] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            namespace (str): Name separating this cache's entries from other caches.
+            ttl (Optional[float], optional): Default lifetime of an entry in seconds.
+                Defaults to None (no expiry).
+            path (str, optional): Path of the SQLite database file. Defaults to CACHE_DB_PATH.
+            max_entries (Optional[int], optional): Maximum number of entries kept.
+                Defaults to None (no limit).
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.path = path or CACHE_DB_PATH
+        self.max_entries = max_entries
+        self._writes = itertools.count()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        connection = _connect(self.path)
+        with _locks[self.path]:
+            return connection.execute(sql, params).fetchall()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up a fresh entry.
+
+        Args:
+            key (str): The cache key.
+            default (Any, optional): Value returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value, or ``default`` if the key is absent or expired.
+        """
+        rows = self._execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+        if not rows:
+            return default
+        value, expires_at = rows[0]
+        if expires_at is not None and expires_at <= time.time():
+            return default
+        if self.max_entries is not None:
+            self._execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key),
+            )
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = MISSING) -> None:
+        """Store an entry.
+
+        Args:
+            key (str): The cache key.
+            value (Any): A JSON-serializable value.
+            ttl (Optional[float], optional): Lifetime in seconds for this entry, or None
+                for no expiry. Defaults to the cache's TTL.
+        """
+        ttl = self.ttl if ttl is MISSING else ttl
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(namespace, key, value, created_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.namespace,
+                key,
+                json.dumps(value),
+                now,
+                None if ttl is None else now + ttl,
+                now,
+            ),
+        )
+        if self.max_entries is not None and next(self._writes) % CACHE_EVICTION_INTERVAL == 0:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Drop expired entries first, then the least recently used beyond max_entries.
+        # Ordering by accessed_at alone lets SQLite walk the cache_entries_accessed index.
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time()),
+        )
+        count = self._execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        )[0][0]
+        if count <= self.max_entries:
+            return
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? "
+            "ORDER BY accessed_at LIMIT ?)",
+            (self.namespace, self.namespace, count - self.max_entries),
+        )
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Return all fresh entries of this cache.
+
+        Returns:
+            List[Tuple[str, Any]]: (key, value) pairs, oldest first.
+        """
+        rows = self._execute(
+            "SELECT key, value FROM cache_entries "
+            "WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?) "
+            "ORDER BY created_at",
+            (self.namespace, time.time()),
+        )
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def keys(self) -> List[str]:
+        """Return the keys of all fresh entries of this cache.
+
+        Returns:
+            List[str]: The keys, oldest first.
+        """
+        rows = self._execute(
+            "SELECT key FROM cache_entries "
+            "WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?) "
+            "ORDER BY created_at",
+            (self.namespace, time.time()),
+        )
+        return [key for key, in rows]
+
+    def delete(self, key: str) -> None:
+        """Remove an entry.
+
+        Args:
+            key (str): The cache key.
+        """
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def clear(self) -> None:
+        """Remove all entries of this cache."""
+        self._execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
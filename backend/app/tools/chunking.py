@@ -0,0 +1,151 @@
+import math
+from collections import Counter
+from typing import List, Optional
+import tiktoken
+from tools.names import normalize_university_name
+
+
+CHUNK_TOKENS = 200  # target size of a chunk
+BM25_K1 = 1.5
+BM25_B = 0.75
+CHUNK_SEPARATOR = "\n...\n"
+
+_encoding: Optional[tiktoken.Encoding] = None
+
+
+def get_encoding() -> tiktoken.Encoding:
+    """Return the tokenizer of the deployed model, loading it on first use.
+
+    Returns:
+        tiktoken.Encoding: The tokenizer.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count the model tokens in a text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def split_into_chunks(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Split a text into chunks of whole lines of roughly ``chunk_tokens`` tokens.
+
+    Lines longer than a chunk are split on token boundaries.
+
+    Args:
+        text (str): The text to split.
+        chunk_tokens (int, optional): Target tokens per chunk. Defaults to CHUNK_TOKENS.
+
+    Returns:
+        List[str]: The chunks, in document order.
+    """
+    encoding = get_encoding()
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        tokens = encoding.encode(line, disallowed_special=())
+        if len(tokens) > chunk_tokens:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            for start in range(0, len(tokens), chunk_tokens):
+                chunks.append(encoding.decode(tokens[start:start + chunk_tokens]))
+            continue
+        if current_tokens + len(tokens) > chunk_tokens and current:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += len(tokens)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _terms(text: str) -> List[str]:
+    # Lowercase ASCII words, with umlauts transliterated ("ü" -> "ue") and accents stripped.
+    return normalize_university_name(text).split()
+
+
+def bm25_scores(chunks: List[str], query: str) -> List[float]:
+    """Score chunks against a query with Okapi BM25.
+
+    Args:
+        chunks (List[str]): The chunks to score.
+        query (str): The query.
+
+    Returns:
+        List[float]: One score per chunk; higher is more relevant.
+    """
+    documents = [Counter(_terms(chunk)) for chunk in chunks]
+    if not documents:
+        return []
+    lengths = [sum(document.values()) for document in documents]
+    average_length = (sum(lengths) / len(lengths)) or 1.0
+    query_terms = set(_terms(query))
+    document_frequency = {
+        term: sum(1 for document in documents if term in document) for term in query_terms
+    }
+
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            )
+        scores.append(score)
+    return scores
+
+
+def select_relevant_chunks(text: str, query: str, max_tokens: int) -> str:
+    """Keep only the parts of a text most relevant to a query, within a token budget.
+
+    The text is split into chunks, ranked with BM25 against the query, and the best
+    chunks are kept until the budget is spent. The selected chunks are returned in
+    document order. Texts that already fit the budget are returned unchanged.
+
+    Args:
+        text (str): The text to reduce.
+        query (str): Describes what the caller is looking for.
+        max_tokens (int): Maximum number of tokens to return.
+
+    Returns:
+        str: The selected chunks, joined by CHUNK_SEPARATOR.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    chunks = split_into_chunks(text)
+    scores = bm25_scores(chunks, query)
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+    selected = []
+    budget = max_tokens
+    for index in ranked:
+        tokens = count_tokens(chunks[index]) + 1
+        if tokens > budget:
+            continue
+        selected.append(index)
+        budget -= tokens
+    return CHUNK_SEPARATOR.join(chunks[i] for i in sorted(selected))
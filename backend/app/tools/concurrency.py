@@ -0,0 +1,431 @@
+import asyncio
+import contextvars
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+def iter_with_deadlines(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: int,
+    timeout: Optional[float],
+    fallback: Callable[[Any, Optional[BaseException]], Any],
+    interval: float = 0,
+) -> Iterator[Tuple[int, Any]]:
+    """Apply a function to every item with bounded concurrency, yielding results as they finish.
+
+    Each call runs in its own daemon thread, at most ``max_workers`` calls are
+    active at a time, and calls start at least ``interval`` seconds apart, e.g. to
+    stay below a rate limit. A call gets ``timeout`` seconds from the moment it starts;
+    calls that raise or overrun their deadline are replaced by
+    ``fallback(item, error)``. An overrunning call is abandoned: it keeps running
+    in the background but frees its slot, so queued items start right away and a
+    few hung calls cannot stall the rest. Abandoned calls do not keep the process
+    from exiting.
+
+    Args:
+        func (Callable[[Any], Any]): Function to apply to each item.
+        items (Sequence[Any]): Items to process.
+        max_workers (int): Maximum number of concurrent calls.
+        timeout (Optional[float]): Seconds each call may run, or None for no limit.
+        fallback (Callable[[Any, Optional[BaseException]], Any]): Produces the result
+            for an item that failed (with the exception) or timed out (with None).
+        interval (float, optional): Minimum seconds between the starts of two calls.
+            Defaults to 0.
+
+    Yields:
+        Tuple[int, Any]: The index of an item and its result, in completion order.
+    """
+    finished: queue.Queue = queue.Queue()
+    deadlines: Dict[int, float] = {}  # index of each active call -> its deadline
+    next_index = 0
+    next_start = time.monotonic()
+
+    def run(index: int, item: Any) -> None:
+        try:
+            finished.put((index, func(item), None))
+        except BaseException as e:
+            finished.put((index, None, e))
+
+    while next_index < len(items) or deadlines:
+        while (
+            next_index < len(items)
+            and len(deadlines) < max(1, max_workers)
+            and time.monotonic() >= next_start
+        ):
+            # Each call runs in a copy of the caller's context so that context
+            # variables (e.g. LLM usage attribution) carry over into its thread.
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(run, next_index, items[next_index]),
+                daemon=True,
+            ).start()
+            deadlines[next_index] = (
+                float("inf") if timeout is None else time.monotonic() + timeout
+            )
+            next_index += 1
+            next_start = time.monotonic() + interval
+
+        wakeups = list(deadlines.values())
+        if next_index < len(items) and len(deadlines) < max(1, max_workers):
+            wakeups.append(next_start)  # the next call is only held back by the interval
+        wait_for = min(wakeups) - time.monotonic()
+        try:
+            index, result, error = finished.get(
+                timeout=None if wait_for == float("inf") else max(0.0, wait_for)
+            )
+        except queue.Empty:
+            now = time.monotonic()
+            for index in [i for i, deadline in deadlines.items() if deadline <= now]:
+                del deadlines[index]
+                yield index, fallback(items[index], None)
+            continue
+
+        if index not in deadlines:
+            continue  # late result of an abandoned call
+        del deadlines[index]
+        if error is None:
+            yield index, result
+        elif isinstance(error, Exception):
+            yield index, fallback(items[index], error)
+        else:
+            raise error
+
+
+def map_with_deadlines(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: int,
+    timeout: Optional[float],
+    fallback: Callable[[Any, Optional[BaseException]], Any],
+    interval: float = 0,
+) -> List[Any]:
+    """Apply a function to every item with bounded concurrency and a per-item deadline.
+
+    See iter_with_deadlines for the deadline, interval and fallback semantics.
+
+    Args:
+        func (Callable[[Any], Any]): Function to apply to each item.
+        items (Sequence[Any]): Items to process.
+        max_workers (int): Maximum number of concurrent calls.
+        timeout (Optional[float]): Seconds each call may run, or None for no limit.
+        fallback (Callable[[Any, Optional[BaseException]], Any]): Produces the result
+            for an item that failed (with the exception) or timed out (with None).
+        interval (float, optional): Minimum seconds between the starts of two calls.
+            Defaults to 0.
+
+    Returns:
+        List[Any]: Results in the same order as ``items``.
+    """
+    results: List[Any] = [None] * len(items)
+    for index, result in iter_with_deadlines(
+        func, items, max_workers, timeout, fallback, interval
+    ):
+        results[index] = result
+    return results
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    While a call for a key is in flight, further calls for that key wait for it and
+    share its result (or exception) instead of running the function again.
+    """
+    def __init__(self):
+        """Initialize the SingleFlight group."""
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run ``func`` for ``key`` unless a call for the same key is already in flight.
+
+        Args:
+            key (str): Identifies calls that may share a result.
+            func (Callable[[], Any]): The function to run.
+
+        Returns:
+            Any: The result of the (possibly shared) call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+async def aiter_with_deadlines(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    max_concurrency: int,
+    timeout: Optional[float],
+    fallback: Callable[[Any, Optional[BaseException]], Any],
+) -> AsyncIterator[Tuple[int, Any]]:
+    """Apply a coroutine function to every item with bounded concurrency, yielding results as they finish.
+
+    The asyncio counterpart of iter_with_deadlines: each item gets its own deadline,
+    measured from the moment it acquires one of ``max_concurrency`` slots, and items
+    that raise or overrun it are replaced by ``fallback(item, error)``, which may
+    also be a coroutine function. Overrunning calls are cancelled.
+
+    Args:
+        func (Callable[[Any], Awaitable[Any]]): The coroutine function to apply.
+        items (Sequence[Any]): The items to process.
+        max_concurrency (int): Maximum number of concurrent calls.
+        timeout (Optional[float]): Seconds allowed per item, or None for no limit.
+        fallback (Callable[[Any, Optional[BaseException]], Any]): Produces the result
+            for an item that failed (with the exception) or timed out (with None).
+
+    Yields:
+        Tuple[int, Any]: The index of an item and its result, in completion order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(index: int, item: Any) -> Tuple[int, Any]:
+        async with semaphore:
+            try:
+                return index, await asyncio.wait_for(func(item), timeout)
+            except asyncio.TimeoutError:
+                result = fallback(item, None)
+            except Exception as e:
+                result = fallback(item, e)
+            return index, await result if inspect.isawaitable(result) else result
+
+    tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def amap_with_deadlines(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    max_concurrency: int,
+    timeout: Optional[float],
+    fallback: Callable[[Any, Optional[BaseException]], Any],
+) -> List[Any]:
+    """Apply a coroutine function to every item with bounded concurrency and per-item deadlines.
+
+    Args:
+        func (Callable[[Any], Awaitable[Any]]): The coroutine function to apply.
+        items (Sequence[Any]): The items to process.
+        max_concurrency (int): Maximum number of concurrent calls.
+        timeout (Optional[float]): Seconds allowed per item, or None for no limit.
+        fallback (Callable[[Any, Optional[BaseException]], Any]): Produces the result
+            for an item that failed (with the exception) or timed out (with None).
+
+    Returns:
+        List[Any]: One result per item, in input order.
+    """
+    results: List[Any] = [None] * len(items)
+    async for index, result in aiter_with_deadlines(
+        func, items, max_concurrency, timeout, fallback
+    ):
+        results[index] = result
+    return results
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls for the same key into a single execution.
+
+    The shared call runs as its own task, so a caller that is cancelled (e.g. by a
+    client disconnect) does not cancel it for the others.
+    """
+    def __init__(self):
+        """Initialize the AsyncSingleFlight group."""
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, so an unawaited failure is not logged
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``func()`` for ``key`` unless a call for the same key is already in flight.
+
+        Args:
+            key (str): Identifies calls that may share a result.
+            func (Callable[[], Awaitable[Any]]): The coroutine function to run.
+
+        Returns:
+            Any: The result of the (possibly shared) call.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
+
+
+class AsyncRequestCoalescer:
+    """AsyncSingleFlight with an optional short-lived cache of results.
+
+    Concurrent calls for the same key share one execution; with a positive ``ttl``
+    its result is also returned to calls for that key arriving within ``ttl``
+    seconds afterwards. Exceptions are shared but never cached.
+    """
+    def __init__(self, ttl: float = 0):
+        """Initialize the coalescer.
+
+        Args:
+            ttl (float, optional): Seconds a result stays cached. Defaults to 0 (no caching).
+        """
+        self.ttl = ttl
+        self._flight = AsyncSingleFlight()
+        self._results: Dict[str, Tuple[float, Any]] = {}
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            del self._results[key]
+            return False, None
+        return True, entry[1]
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result for ``key`` or await ``func()``, sharing concurrent calls.
+
+        Args:
+            key (str): Identifies calls that may share a result.
+            func (Callable[[], Awaitable[Any]]): The coroutine function to run.
+
+        Returns:
+            Any: The result of the (possibly shared or cached) call.
+        """
+        hit, result = self._cached(key)
+        if hit:
+            return result
+
+        async def run() -> Any:
+            result = await func()
+            if self.ttl > 0:
+                now = time.monotonic()
+                for expired in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                    del self._results[expired]
+                self._results[key] = (now + self.ttl, result)
+            return result
+
+        return await self._flight.do(key, run)
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop that runs coroutines for synchronous callers, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="run-coroutine", daemon=True).start()
+        return _loop
+
+
+def run_coroutine(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion from synchronous code and return its result.
+
+    All synchronous callers share one event loop on a daemon thread instead of
+    starting a loop per call, so clients that bind to a loop (the pooled HTTP
+    client, the LLM's async client, per-host semaphores) keep working across calls
+    and threads. The coroutine sees the caller's context variables, such as the
+    usage attribution.
+
+    Args:
+        coroutine (Coroutine[Any, Any, Any]): The coroutine to run.
+
+    Returns:
+        Any: The result of the coroutine.
+
+    Raises:
+        RuntimeError: If called from a running event loop; await the coroutine instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coroutine.close()
+        raise RuntimeError("run_coroutine cannot be called from a running event loop")
+
+    loop = _background_loop()
+    context = contextvars.copy_context()
+    result: Future = Future()
+
+    def finished(task: asyncio.Task) -> None:
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start() -> None:
+        # Tasks copy the current context, so creating it inside ``context`` hands it over.
+        task = context.run(loop.create_task, coroutine)
+        task.add_done_callback(finished)
+
+    loop.call_soon_threadsafe(start)
+    return result.result()
+
+
+def iterate_async(iterator: AsyncIterator[Any]) -> Iterator[Any]:
+    """Iterate over an async iterator from synchronous code, one run_coroutine call per item.
+
+    The async iterator is closed when the iteration stops early.
+
+    Args:
+        iterator (AsyncIterator[Any]): The async iterator, e.g. an async generator.
+
+    Yields:
+        Any: The items of the async iterator.
+    """
+    async def next_item() -> Any:
+        return await iterator.__anext__()
+
+    try:
+        while True:
+            try:
+                yield run_coroutine(next_item())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            run_coroutine(aclose())
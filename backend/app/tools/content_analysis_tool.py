@@ -1,13 +1,34 @@
-import requests
+import asyncio
 from typing import Dict
-from bs4 import BeautifulSoup
+from urllib.parse import urlsplit
 from langchain.agents.agent_types import AgentType
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
+from tools.chunking import select_relevant_chunks
+from tools.fetcher import ascrape_text_from_url
+from tools.page_store import page_store
+from tools.usage import llm_caller
 from tools.utils import llm
 
 
+MAX_TEXT_TOKENS = 2000  # Adjust based on token limits of your LLM
+
+IMPORTANT_POINTS_TEMPLATE = """
+        You are an expert at extracting and summarizing important information.
+        
+        I have the following text content from a webpage, and I need you to extract 
+        the {max_points} most important points related to this query: "{query}"
+        
+        Webpage content:
+        {text_content}
+        
+        Return ONLY a numbered list of the {max_points} most important and relevant points.
+        Each point should be concise but informative (1-2 sentences each).
+        If there are fewer than {max_points} relevant points, return only those that are relevant.
+        """
+
+
 class ContentAnalysisSchema(BaseModel):
     """Schema for content analysis requests.
     
@@ -25,58 +46,48 @@ class ContentAnalysisSchema(BaseModel):
     )
 
 
-def scrape_text_from_url(url: str) -> str:
-    """Extract plain text content from a webpage.
-    
-    Args:
-        url: The URL of the webpage to scrape.
-
-    Returns:
-        The plain text content of the webpage.
-
-    Raises:
-        requests.exceptions.RequestException: If the HTTP request fails.
-    """
-    response = requests.get(url)
-    return BeautifulSoup(response.text, "html.parser").get_text()
-
-
-def extract_important_points(url: str, query: str, max_points: int = 5) -> Dict:
+@llm_caller("extract_important_points")
+async def aextract_important_points(url: str, query: str, max_points: int = 5) -> Dict:
     """
     Scrapes text from a URL and extracts the most important points related to a query.
 
+    If the page cannot be fetched, the points are extracted from the chunks of
+    previously fetched pages of the same host most relevant to the query instead,
+    and those pages are reported as the sources. Pages of other hosts are never
+    used, since they may describe another university.
+
     Args:
         url: The URL to scrape content from
         query: The query to use for extracting relevant information
         max_points: Maximum number of important points to extract (default: 5)
 
     Returns:
-        Dictionary with the URL, query, and extracted important points
+        Dictionary with the URL, query, the URLs of the pages the points were
+        extracted from ('sources'), and extracted important points
     """
     try:
-        scraped_text = scrape_text_from_url(url)
-        max_text_length = 8000  # Adjust based on token limits of your LLM
-        if len(scraped_text) > max_text_length:
-            scraped_text = scraped_text[:max_text_length] + "... [text truncated]"
-
-        template = """
-        You are an expert at extracting and summarizing important information.
-        
-        I have the following text content from a webpage, and I need you to extract 
-        the {max_points} most important points related to this query: "{query}"
-        
-        Webpage content:
-        {text_content}
-        
-        Return ONLY a numbered list of the {max_points} most important and relevant points.
-        Each point should be concise but informative (1-2 sentences each).
-        If there are fewer than {max_points} relevant points, return only those that are relevant.
-        """
-
-        prompt = ChatPromptTemplate.from_template(template)
+        try:
+            scraped_text = await ascrape_text_from_url(url)
+            scraped_text = await asyncio.to_thread(
+                select_relevant_chunks, scraped_text, query, MAX_TEXT_TOKENS
+            )
+            sources = [url]
+        except Exception as e:
+            host = urlsplit(url).hostname
+            scraped_text, sources = await asyncio.to_thread(
+                page_store.relevant_text,
+                query,
+                MAX_TEXT_TOKENS,
+                url_filter=lambda source: host is not None and urlsplit(source).hostname == host,
+            )
+            if not scraped_text:
+                raise
+            print(f"Error scraping {url}, using stored pages instead: {str(e)}")
+
+        prompt = ChatPromptTemplate.from_template(IMPORTANT_POINTS_TEMPLATE)
         chain = prompt | llm
 
-        result = chain.invoke(
+        result = await chain.ainvoke(
             {"query": query, "text_content": scraped_text, "max_points": max_points}
         )
         points_text = result.content.strip()
@@ -85,17 +96,20 @@ def extract_important_points(url: str, query: str, max_points: int = 5) -> Dict:
         return {
             "url": url,
             "query": query,
+            "sources": sources,
             "important_points": points_list,
             "source_length": len(scraped_text),
         }
 
     except Exception as e:
-        return {"url": url, "query": query, "error": str(e), "important_points": []}
+        return {
+            "url": url, "query": query, "sources": [], "error": str(e), "important_points": []
+        }
 
 
 # Tool creation with explicit argument specification
 content_analysis_tool = StructuredTool.from_function(
-    func=extract_important_points,
+    coroutine=aextract_important_points,
     name="ContentAnalyzer",
     description="Scrapes content from a URL and extracts the most important points related to a query.",
     args_schema=ContentAnalysisSchema,
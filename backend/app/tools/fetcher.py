@@ -0,0 +1,231 @@
+import asyncio
+import codecs
+import random
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from tools.html_text import HTMLTextExtractor
+from tools.page_cache import CachedPage, page_cache
+from tools.page_store import page_store
+
+
+CONNECT_TIMEOUT = 5  # seconds
+READ_TIMEOUT = 15  # seconds
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.5  # sleeps 0.5s, 1s, 2s, ... between retries
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_HOSTS = 32  # connection pools kept alive at the same time
+MAX_CONNECTIONS_PER_HOST = 4
+MAX_CONTENT_BYTES = 2 * 1024 * 1024  # larger pages are truncated
+CHUNK_SIZE = 64 * 1024
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+try:
+    import brotli  # noqa: F401  (enables "br" decoding in httpx)
+
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; Q-Summit-Bot/1.0)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+}
+
+
+class UnsupportedContentTypeError(Exception):
+    """Raised when a URL does not serve HTML or plain text (e.g. PDFs or images)."""
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared asynchronous HTTP client, creating it on first use.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_HOSTS * MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=MAX_HOSTS,
+            ),
+            follow_redirects=True,
+        )
+    return _async_client
+
+
+def _check_content_type(url: str, content_type: str) -> str:
+    """Validate the Content-Type of a response before its body is downloaded.
+
+    Args:
+        url (str): The URL, for the error message.
+        content_type (str): The Content-Type header value.
+
+    Returns:
+        str: The media type, e.g. "text/html".
+
+    Raises:
+        UnsupportedContentTypeError: If the media type is not in TEXT_CONTENT_TYPES.
+    """
+    media_type = content_type.split(";")[0].strip().lower() or "text/html"
+    if media_type not in TEXT_CONTENT_TYPES:
+        raise UnsupportedContentTypeError(f"Unsupported content type {media_type} for {url}")
+    return media_type
+
+
+def _charset(content_type: str) -> str:
+    """Return the charset declared in a Content-Type header, defaulting to UTF-8.
+
+    Args:
+        content_type (str): The Content-Type header value.
+
+    Returns:
+        str: A codec name known to Python.
+    """
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset":
+            charset = value.strip().strip('"').lower()
+            try:
+                codecs.lookup(charset)
+                return charset
+            except LookupError:
+                break
+    return "utf-8"
+
+
+class _TextAccumulator:
+    """Decodes a byte stream chunk by chunk and extracts its text within a byte budget.
+
+    Attributes:
+        truncated (bool): Whether the byte budget was exhausted.
+    """
+    def __init__(self, content_type: str, media_type: str):
+        self._decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+        self._extractor = HTMLTextExtractor() if media_type != "text/plain" else None
+        self._plain_parts = []
+        self._received = 0
+        self.body = bytearray()
+        self.truncated = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume a chunk; returns False once the byte budget is exhausted."""
+        remaining = MAX_CONTENT_BYTES - self._received
+        if len(chunk) >= remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self._received += len(chunk)
+        self.body += chunk
+        self._write(self._decoder.decode(chunk))
+        return not self.truncated
+
+    def _write(self, text: str) -> None:
+        if self._extractor is None:
+            self._plain_parts.append(text)
+        else:
+            self._extractor.feed(text)
+
+    def get_text(self) -> str:
+        self._write(self._decoder.decode(b"", final=True))
+        if self._extractor is None:
+            return "".join(self._plain_parts)
+        self._extractor.close()
+        return self._extractor.get_text()
+
+
+def _cached_page(url: str) -> Tuple[Optional[CachedPage], Optional[str]]:
+    """Return the page cache entry of a URL and its text, if both are available."""
+    page = page_cache.lookup(url)
+    text = page_cache.read_text(page) if page is not None else None
+    return (page, text) if text is not None else (None, None)
+
+
+async def afetch_text(url: str) -> str:
+    """Download a page with the shared asynchronous client and extract its text as it streams in.
+
+    Pages are read through the on-disk page cache: fresh pages are served locally,
+    stale ones are revalidated with a conditional request and served locally on a
+    304, and if revalidation fails the stale copy is served. At most
+    MAX_CONTENT_BYTES are read; non-text responses are rejected from their headers
+    before the body is downloaded. Retries transport errors and RETRY_STATUS_CODES
+    with exponential backoff and limits concurrent requests to
+    MAX_CONNECTIONS_PER_HOST per host.
+
+    Args:
+        url (str): The URL to fetch.
+
+    Returns:
+        str: The page text without scripts, styles and navigation.
+
+    Raises:
+        httpx.HTTPError: If the request fails, times out or returns an error status.
+        UnsupportedContentTypeError: If the page is not HTML or plain text.
+    """
+    cached, cached_text = await asyncio.to_thread(_cached_page, url)
+    if cached is not None and page_cache.is_fresh(cached):
+        return cached_text
+
+    headers = page_cache.validators(cached) if cached is not None else {}
+    host = urlsplit(url).netloc
+    semaphore = _host_semaphores.setdefault(
+        host, asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    )
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        await asyncio.to_thread(page_cache.revalidated, cached, response.headers)
+                        return cached_text
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                        response.raise_for_status()
+                        content_type = response.headers.get("Content-Type", "")
+                        accumulator = _TextAccumulator(
+                            content_type, _check_content_type(url, content_type)
+                        )
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            if not accumulator.feed(chunk):
+                                break
+                        text = accumulator.get_text()
+                        await asyncio.to_thread(
+                            page_cache.store, url, bytes(accumulator.body), text, response.headers
+                        )
+                        return text
+        except httpx.HTTPError as e:
+            if cached is not None:
+                print(f"Error revalidating {url}, serving cached copy: {str(e)}")
+                return cached_text
+            if not isinstance(e, httpx.TransportError) or attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt) * (1 + random.random() / 2))
+
+
+async def ascrape_text_from_url(url: str) -> str:
+    """Extract plain text content from a webpage without blocking the event loop.
+
+    Pages are read through the page cache (see afetch_text) and indexed in the local
+    page store whenever their text changes.
+
+    Args:
+        url (str): The URL to scrape.
+
+    Returns:
+        str: The plain text content extracted from the page.
+
+    Raises:
+        httpx.HTTPError: If the HTTP request fails.
+        UnsupportedContentTypeError: If the page is not HTML or plain text.
+    """
+    text = await afetch_text(url)
+    if not await asyncio.to_thread(page_store.is_current, url, text):
+        await asyncio.to_thread(page_store.add_page, url, text)
+    return text
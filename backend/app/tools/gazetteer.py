@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+from tools.names import canonical_university_key, register_alias, register_name
+
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "universities.json"
+    ),
+)
+
+
+class Gazetteer:
+    """Offline index of known universities and their base facts.
+
+    Entries are loaded from a bundled JSON file with "name", "aliases", "country",
+    "city", "domain", "student_count", "languages", "ranking" and "description".
+    Names and aliases are registered with the shared university name index, so any
+    known variant of a name finds its entry.
+    """
+    def __init__(self, path: str = GAZETTEER_PATH):
+        """Load the gazetteer.
+
+        Args:
+            path (str, optional): Path of the JSON data file. Defaults to GAZETTEER_PATH.
+        """
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading university gazetteer {path}: {str(e)}")
+            return
+
+        for entry in entries:
+            for alias in entry.get("aliases", []):
+                register_alias(alias, entry["name"])
+            register_name(entry["name"])
+            self._entries[canonical_university_key(entry["name"])] = entry
+
+    def lookup(self, university_name: str) -> Optional[Dict[str, Any]]:
+        """Find the entry of a university.
+
+        Args:
+            university_name (str): Any known name variant of the university.
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry, or None if the university is unknown.
+        """
+        return self._entries.get(canonical_university_key(university_name))
+
+    def is_known(self, university_name: str) -> bool:
+        """Check whether a name belongs to a known, real university.
+
+        Args:
+            university_name (str): The university name.
+
+        Returns:
+            bool: True if the gazetteer has an entry for the university.
+        """
+        return self.lookup(university_name) is not None
+
+    def domains(self) -> List[str]:
+        """Return the web domains of all known universities.
+
+        Returns:
+            List[str]: Domains such as "uni-muenster.de".
+        """
+        return [entry["domain"] for entry in self._entries.values() if entry.get("domain")]
+
+    def profile(self, university_name: str) -> Optional[Dict[str, Any]]:
+        """Build a university profile in the shape of aget_university_details.
+
+        Args:
+            university_name (str): The university name.
+
+        Returns:
+            Optional[Dict[str, Any]]: Title, description, student count, ranking and
+                languages, or None if the university is unknown.
+        """
+        entry = self.lookup(university_name)
+        if entry is None:
+            return None
+        return {
+            "title": entry["name"],
+            "description": entry["description"],
+            "student_count": entry["student_count"],
+            "ranking": entry["ranking"],
+            "languages": list(entry["languages"]),
+            "country": entry["country"],
+            "city": entry["city"],
+        }
+
+
+gazetteer = Gazetteer()
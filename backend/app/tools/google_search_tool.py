@@ -1,11 +1,31 @@
+import asyncio
 import re
 from typing import Dict, List, Optional, Union
-from googlesearch import search
 from langchain.agents.agent_types import AgentType
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
+from tools.relevance import aclassify_relevance_batch
+from tools.usage import llm_caller
 from tools.utils import llm
+from tools.web_search import agoogle_search
+
+
+RELEVANCE_CRITERIA = """
+    You are an expert at evaluating search results for study abroad applications. 
+    
+    Carefully evaluate if a search result is HIGHLY relevant to the query: "{filter_query}"
+    
+    RELEVANCE CRITERIA:
+    1. The content must be about study abroad application processes, requirements, or deadlines
+    2. The content must either:
+       a) Be from an official university or education authority source, OR
+       b) Contain specific, actionable information about "{target_university}" exchanges, OR
+       c) Provide generally applicable guidance for all study abroad applications
+    3. Content that only mentions study abroad in passing or is primarily about something else is NOT relevant
+    4. Content about study abroad to universities other than the target university is NOT relevant
+    5. Blog posts, personal experiences, or news articles are mostly NOT relevant unless they contain official information
+"""
 
 
 class GoogleSearchSchema(BaseModel):
@@ -53,30 +73,38 @@ class GoogleSearchSchema(BaseModel):
         return super().model_validate(obj, *args, **kwargs)
 
 
-def google_search_with_filter(query: str, filter_query: str = None) -> List[Dict]:
-    """Perform a Google search and optionally filter results for high relevance.
+RESULT_RELEVANCE_TEMPLATE = RELEVANCE_CRITERIA + """
+    Search result:
+    Title: {title}
+    Description: {snippet}
+    
+    First, analyze how the result meets or fails the criteria above.
+    Then respond with ONLY:
+    - "HIGHLY RELEVANT" - if the result is clearly and directly relevant (meeting criteria 1 AND 2)
+    - "NOT RELEVANT" - if the result fails to meet ANY of the criteria
+    """
+
+
+def _description(value: Union[str, dict, None]) -> Optional[str]:
+    # Agents sometimes pass the schema field ({"description": ...}) instead of its value.
+    if isinstance(value, dict) and "description" in value:
+        return value["description"]
+    if isinstance(value, dict) and "query" in value:
+        return value["query"]
+    return value
+
+
+def format_search_urls(urls: List[str]) -> List[Dict]:
+    """Build search result entries from result URLs.
 
     Args:
-        query (str): The search query to use for Google search.
-        filter_query (Optional[str]): Additional query terms to use for filtering results.
+        urls (List[str]): The result URLs.
 
     Returns:
-        List[dict]: A list of dictionaries with filtered search results, each containing:
-            - 'title': Title of the result (str)
-            - 'url': URL of the result (str)
-            - 'snippet': Snippet or short description (str)
+        List[dict]: Dictionaries with 'title', 'url' and 'snippet' derived from the URL.
     """
-    if isinstance(query, dict) and "description" in query:
-        query = query["description"]
-    elif isinstance(query, dict) and "query" in query:
-        query = query["query"]
-
-    if isinstance(filter_query, dict) and "description" in filter_query:
-        filter_query = filter_query["description"]
-    search_results = list(search(query, num_results=9))
     formatted_results = []
-    
-    for url in search_results:
+    for url in urls:
         title = url.split("/")[-1].replace("-", " ").replace("_", " ")
         if not title or title.endswith((".html", ".htm", ".php", ".asp")):
             domain = url.split("/")[2]
@@ -88,48 +116,107 @@ def google_search_with_filter(query: str, filter_query: str = None) -> List[Dict
                 "snippet": f"URL: {url}",
             }
         )
+    return formatted_results
 
-    if not filter_query:
-        return formatted_results
-    filtered_results = []
 
-    template = """
-    You are an expert at evaluating search results for study abroad applications. 
-    
-    Carefully evaluate if the following search result is HIGHLY relevant to the query: "{filter_query}"
-    
-    Search result:
-    Title: {title}
-    Description: {snippet}
-    
-    RELEVANCE CRITERIA:
-    1. The content must be about study abroad application processes, requirements, or deadlines
-    2. The content must either:
-       a) Be from an official university or education authority source, OR
-       b) Contain specific, actionable information about "{target_university}" exchanges, OR
-       c) Provide generally applicable guidance for all study abroad applications
-    3. Content that only mentions study abroad in passing or is primarily about something else is NOT relevant
-    4. Content about study abroad to universities other than the target university is NOT relevant
-    5. Blog posts, personal experiences, or news articles are mostly NOT relevant unless they contain official information
-    
-    First, analyze how the result meets or fails the criteria above.
-    Then respond with ONLY:
-    - "HIGHLY RELEVANT" - if the result is clearly and directly relevant (meeting criteria 1 AND 2)
-    - "NOT RELEVANT" - if the result fails to meet ANY of the criteria
-    """
+def target_university_of(query: str) -> str:
+    """Guess the target university of a search query.
 
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | llm
-    target_university = ""
+    Args:
+        query (str): The search query.
+
+    Returns:
+        str: The second quoted term of the query, or "" if there is none.
+    """
     match = re.search(r'"([^"]*)".*"([^"]*)"', query)
-    
-    if match:
-        # Assuming second quoted term is the target university
-        target_university = match.group(2)
+    # Assuming second quoted term is the target university
+    return match.group(2) if match else ""
+
+
+def add_target_university_pages(
+    formatted_results: List[Dict], filtered_results: List[Dict], target_university: str
+) -> List[Dict]:
+    """Keep exchange pages of the target university that the LLM filter rejected.
+
+    Args:
+        formatted_results (List[dict]): All search results.
+        filtered_results (List[dict]): The results judged relevant.
+        target_university (str): The target university, or "".
 
+    Returns:
+        List[dict]: The relevant results plus matching university exchange pages.
+    """
+    if not target_university:
+        return filtered_results
     for result in formatted_results:
+        if any(r["url"] == result["url"] for r in filtered_results):
+            continue
+        url_lower = result["url"].lower()
+        target_uni_words = [
+            w.lower() for w in target_university.split() if len(w) > 2
+        ]
+        # If URL contains university domain patterns and target university keywords
+        if (
+            (
+                ".edu" in url_lower
+                or ".ac." in url_lower
+                or "university" in url_lower
+            )
+            and any(word in url_lower for word in target_uni_words)
+            and (
+                "exchange" in url_lower
+                or "abroad" in url_lower
+                or "international" in url_lower
+            )
+        ):
+            filtered_results.append(result)
+    return filtered_results
+
+
+@llm_caller("google_search_with_filter")
+async def agoogle_search_with_filter(
+    query: str, filter_query: str = None, batch: bool = True
+) -> List[Dict]:
+    """Perform a Google search and optionally filter results for high relevance.
+
+    Args:
+        query (str): The search query to use for Google search.
+        filter_query (Optional[str]): Additional query terms to use for filtering results.
+        batch (bool): Classify all results in a single LLM call; results the model
+            does not answer for are evaluated individually and concurrently.
+            Defaults to True.
+
+    Returns:
+        List[dict]: A list of dictionaries with filtered search results, each containing:
+            - 'title': Title of the result (str)
+            - 'url': URL of the result (str)
+            - 'snippet': Snippet or short description (str)
+    """
+    query = _description(query)
+    filter_query = _description(filter_query)
+    search_results = await agoogle_search(query, num_results=9)
+    formatted_results = format_search_urls([result["url"] for result in search_results])
+
+    if not filter_query:
+        return formatted_results
+
+    prompt = ChatPromptTemplate.from_template(RESULT_RELEVANCE_TEMPLATE)
+    chain = prompt | llm
+    target_university = target_university_of(query)
+
+    if batch:
+        verdicts = await aclassify_relevance_batch(
+            formatted_results,
+            RELEVANCE_CRITERIA.format(
+                filter_query=filter_query, target_university=target_university
+            ),
+        )
+    else:
+        verdicts = [None] * len(formatted_results)
+
+    async def evaluate(result: Dict) -> bool:
         try:
-            evaluation = chain.invoke(
+            evaluation = await chain.ainvoke(
                 {
                     "filter_query": filter_query,
                     "title": result["title"],
@@ -137,41 +224,23 @@ def google_search_with_filter(query: str, filter_query: str = None) -> List[Dict
                     "target_university": target_university,
                 }
             )
-
-            if "HIGHLY RELEVANT" in evaluation.content.upper():
-                filtered_results.append(result)
+            return "HIGHLY RELEVANT" in evaluation.content.upper()
         except Exception as e:
             print(f"Error evaluating result {result['title']}: {str(e)}")
+            return False
 
-    if target_university:
-        for result in formatted_results:
-            if any(r["url"] == result["url"] for r in filtered_results):
-                continue
-            url_lower = result["url"].lower()
-            target_uni_words = [
-                w.lower() for w in target_university.split() if len(w) > 2
-            ]
-            # If URL contains university domain patterns and target university keywords
-            if (
-                (
-                    ".edu" in url_lower
-                    or ".ac." in url_lower
-                    or "university" in url_lower
-                )
-                and any(word in url_lower for word in target_uni_words)
-                and (
-                    "exchange" in url_lower
-                    or "abroad" in url_lower
-                    or "international" in url_lower
-                )
-            ):
-                filtered_results.append(result)
+    missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    for i, relevant in zip(
+        missing, await asyncio.gather(*(evaluate(formatted_results[i]) for i in missing))
+    ):
+        verdicts[i] = relevant
 
-    return filtered_results
+    filtered_results = [r for r, relevant in zip(formatted_results, verdicts) if relevant]
+    return add_target_university_pages(formatted_results, filtered_results, target_university)
 
 
 google_search_tool = StructuredTool.from_function(
-    func=google_search_with_filter,
+    coroutine=agoogle_search_with_filter,
     name="GoogleSearchFilter",
     description="Searches Google with the provided query and filters results based on relevance to a filter query.",
     args_schema=GoogleSearchSchema,
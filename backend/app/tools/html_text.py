@@ -0,0 +1,89 @@
+import re
+from html.parser import HTMLParser
+from typing import List
+
+
+# Elements whose content is never useful page text. The document head is skipped
+# separately, as its end tag is optional.
+SKIPPED_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "footer", "button", "select",
+}
+
+# Elements that may appear in the document head; any other element ends it.
+_HEAD_TAGS = {"head", "title", "meta", "link", "base", "style", "script", "noscript", "template"}
+
+# Elements that start a new line of text.
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "br", "hr", "li", "ul", "ol",
+    "table", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "dd", "dt", "figcaption",
+}
+
+_VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "wbr"}
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Incrementally extracts readable text from HTML, skipping boilerplate.
+
+    Feed the document in chunks with ``feed`` as it is downloaded and call ``get_text``
+    at the end. Script, style, navigation and similar elements are dropped and block
+    elements are separated by newlines.
+    """
+    def __init__(self):
+        """Initialize the extractor."""
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._in_head = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "head":
+            self._in_head = True
+        elif tag not in _HEAD_TAGS:
+            self._in_head = False
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS and not self._skip_depth:
+            self._parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self._skip_depth:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS and tag not in _VOID_TAGS and not self._skip_depth:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self._in_head:
+            self._parts.append(data)
+
+    def get_text(self) -> str:
+        """Return the text extracted so far.
+
+        Returns:
+            str: The text, with whitespace collapsed and one block per line.
+        """
+        text = "".join(self._parts)
+        lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in text.split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+def extract_text(html: str) -> str:
+    """Extract the readable text from a complete HTML document.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        str: The plain text content without scripts, styles and navigation.
+    """
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.get_text()
@@ -0,0 +1,466 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tools.usage import usage_scope
+
+
+JOB_DB_PATH = os.getenv(
+    "JOB_DB_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "jobs.sqlite3",
+    ),
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+JOB_TIMEOUT = 10 * 60  # seconds a job may run before it is failed
+JOB_LEASE_MARGIN = 60  # a running job is requeued this long after its timeout passed
+JOB_MAX_ATTEMPTS = 2  # a job interrupted this often (e.g. by restarts) is failed
+JOB_RETENTION = 7 * 24 * 60 * 60  # finished jobs are deleted after this long
+JOB_POLL_INTERVAL = 1.0  # seconds between store checks of idle workers and waiters
+
+
+class JobStore:
+    """Persistent queue of background jobs in a local SQLite database.
+
+    Jobs move from "queued" to "running" to "succeeded" or "failed". A worker claims a
+    job by leasing it until its timeout has passed; jobs whose lease expired, because
+    the process running them stopped, are queued again. The store is safe to share
+    between threads and between processes using the same database file.
+
+    Attributes:
+        path (str): Path of the SQLite database file.
+    """
+    _COLUMNS = (
+        "id, kind, key, params, status, result, error, attempts, "
+        "created_at, started_at, finished_at"
+    )
+
+    def __init__(self, path: str = None):
+        """Initialize the store.
+
+        Args:
+            path (str, optional): Path of the SQLite database file. Defaults to JOB_DB_PATH.
+        """
+        self.path = path or JOB_DB_PATH
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds self._lock.
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    leased_until REAL
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (kind, status, created_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (kind, key, status)")
+            self._connection = connection
+        return self._connection
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _update(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._connect().execute(sql, params).rowcount
+
+    @staticmethod
+    def _job(row: tuple) -> Dict[str, Any]:
+        (
+            job_id, kind, key, params, status, result, error, attempts,
+            created_at, started_at, finished_at,
+        ) = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "key": key,
+            "params": json.loads(params),
+            "status": status,
+            "result": None if result is None else json.loads(result),
+            "error": error,
+            "attempts": attempts,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def submit(self, kind: str, params: Dict[str, Any], key: str = None) -> Dict[str, Any]:
+        """Queue a job, or return the unfinished job with the same key.
+
+        Args:
+            kind (str): The job type, selecting the handler that runs it.
+            params (Dict[str, Any]): JSON-serializable parameters of the handler.
+            key (str, optional): Identifies jobs producing the same result; a queued
+                or running job with this key is returned instead of a new one.
+                Defaults to None (never shared).
+
+        Returns:
+            Dict[str, Any]: The job.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if key is not None:
+                    rows = connection.execute(
+                        f"SELECT {self._COLUMNS} FROM jobs "
+                        "WHERE kind = ? AND key = ? AND status IN (?, ?) "
+                        "ORDER BY created_at LIMIT 1",
+                        (kind, key, QUEUED, RUNNING),
+                    ).fetchall()
+                    if rows:
+                        connection.execute("COMMIT")
+                        return self._job(rows[0])
+                job_id = uuid.uuid4().hex
+                connection.execute(
+                    "INSERT INTO jobs (id, kind, key, params, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, key, json.dumps(params), QUEUED, time.time()),
+                )
+                rows = connection.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+                ).fetchall()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return self._job(rows[0])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job, or None if it does not exist.
+        """
+        rows = self._execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        return self._job(rows[0]) if rows else None
+
+    def claim(self, kind: str, lease: float = JOB_TIMEOUT + JOB_LEASE_MARGIN) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job of a kind and mark it as running.
+
+        Args:
+            kind (str): The job type.
+            lease (float, optional): Seconds until the job may be queued again if it
+                is not finished. Defaults to JOB_TIMEOUT + JOB_LEASE_MARGIN.
+
+        Returns:
+            Optional[Dict[str, Any]]: The claimed job, or None if none is queued.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs WHERE kind = ? AND status = ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (kind, QUEUED),
+                ).fetchall()
+                if rows:
+                    now = time.time()
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, leased_until = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, now, now + lease, rows[0][0]),
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        if not rows:
+            return None
+        job = self._job(rows[0])
+        job.update(status=RUNNING, started_at=now, attempts=job["attempts"] + 1)
+        return job
+
+    def finish(self, job_id: str, result: Any) -> None:
+        """Record the result of a job.
+
+        Args:
+            job_id (str): The job id.
+            result (Any): A JSON-serializable result.
+        """
+        self._update(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ?, leased_until = NULL "
+            "WHERE id = ?",
+            (SUCCEEDED, json.dumps(result), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Record that a job failed.
+
+        Args:
+            job_id (str): The job id.
+            error (str): Description of the error.
+        """
+        self._update(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, leased_until = NULL "
+            "WHERE id = ?",
+            (FAILED, error, time.time(), job_id),
+        )
+
+    def requeue(self, kind: str, leased_before: float, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Queue running jobs again whose lease ends before ``leased_before``.
+
+        Jobs that already ran ``max_attempts`` times are failed instead, so a job
+        that keeps crashing its process is not retried forever.
+
+        Args:
+            kind (str): The job type.
+            leased_before (float): Timestamp; jobs leased until earlier are requeued.
+            max_attempts (int, optional): Maximum number of runs of a job.
+                Defaults to JOB_MAX_ATTEMPTS.
+
+        Returns:
+            int: Number of jobs queued again.
+        """
+        self._update(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, leased_until = NULL "
+            "WHERE kind = ? AND status = ? AND leased_until <= ? AND attempts >= ?",
+            (FAILED, "Interrupted too often", time.time(), kind, RUNNING, leased_before, max_attempts),
+        )
+        return self._update(
+            "UPDATE jobs SET status = ?, leased_until = NULL "
+            "WHERE kind = ? AND status = ? AND leased_until <= ?",
+            (QUEUED, kind, RUNNING, leased_before),
+        )
+
+    def purge(self, retention: float = JOB_RETENTION) -> None:
+        """Delete jobs that finished more than ``retention`` seconds ago.
+
+        Args:
+            retention (float, optional): Seconds finished jobs are kept.
+                Defaults to JOB_RETENTION.
+        """
+        self._update(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at <= ?",
+            (*FINISHED, time.time() - retention),
+        )
+
+    def count(self, kind: str, status: str) -> int:
+        """Count the jobs of a kind in a status.
+
+        Args:
+            kind (str): The job type.
+            status (str): The job status.
+
+        Returns:
+            int: The number of jobs.
+        """
+        return self._execute(
+            "SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = ?", (kind, status)
+        )[0][0]
+
+
+class JobQueue:
+    """Pool of asyncio workers running the jobs of one kind from a JobStore.
+
+    Workers are started with the application. Clients submit jobs, then poll them
+    with get or wait for changes with wait. Store calls run in worker threads, so
+    they never block the event loop.
+    """
+    def __init__(
+        self,
+        kind: str,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        workers: int,
+        store: JobStore = None,
+        timeout: float = JOB_TIMEOUT,
+    ):
+        """Initialize the queue.
+
+        Args:
+            kind (str): The job type, also the endpoint LLM usage is attributed to.
+            handler (Callable[[Dict[str, Any]], Awaitable[Any]]): Coroutine function
+                computing the JSON-serializable result of a job from its parameters.
+            workers (int): Number of jobs run concurrently.
+            store (JobStore, optional): The job store. Defaults to job_store.
+            timeout (float, optional): Seconds a job may run. Defaults to JOB_TIMEOUT.
+        """
+        self.kind = kind
+        self.handler = handler
+        self.workers = workers
+        self.store = store or job_store
+        self.timeout = timeout
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Event] = None
+
+    def _notify(self) -> None:
+        # Wakes idle workers and waiters; the event is replaced so each wakeup is seen once.
+        if self._changed is not None:
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+
+    async def _sleep(self, seconds: float) -> None:
+        changed = self._changed
+        if changed is None:
+            await asyncio.sleep(seconds)
+            return
+        # asyncio.wait, unlike wait_for, never swallows a cancellation racing the wakeup.
+        waiter = asyncio.ensure_future(changed.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=seconds)
+        finally:
+            waiter.cancel()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        # Usage of the job's LLM calls is reported under the job id.
+        with usage_scope(self.kind, job["id"]):
+            try:
+                result = await asyncio.wait_for(self.handler(job["params"]), self.timeout)
+            except asyncio.TimeoutError:
+                print(f"Job {job['id']} timed out after {self.timeout} seconds")
+                await asyncio.to_thread(
+                    self.store.fail, job["id"], f"Timed out after {self.timeout} seconds"
+                )
+            except Exception as e:
+                print(f"Error running job {job['id']}: {str(e)}")
+                await asyncio.to_thread(self.store.fail, job["id"], str(e))
+            else:
+                try:
+                    await asyncio.to_thread(self.store.finish, job["id"], result)
+                except (TypeError, ValueError) as e:
+                    print(f"Job {job['id']} returned an invalid result: {str(e)}")
+                    await asyncio.to_thread(self.store.fail, job["id"], f"Invalid result: {str(e)}")
+        self._notify()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.requeue, self.kind, time.time())
+                job = await asyncio.to_thread(
+                    self.store.claim, self.kind, self.timeout + JOB_LEASE_MARGIN
+                )
+            except Exception as e:
+                print(f"Error claiming a {self.kind} job: {str(e)}")
+                job = None
+            if job is None:
+                await self._sleep(JOB_POLL_INTERVAL)
+                continue
+            self._notify()
+            try:
+                await self._run(job)
+            except Exception as e:
+                # E.g. the store was locked; the job is queued again once its lease expires.
+                print(f"Error recording the outcome of job {job['id']}: {str(e)}")
+                await self._sleep(JOB_POLL_INTERVAL)
+
+    async def start(self, requeue_unfinished: bool = False) -> None:
+        """Start the workers.
+
+        Args:
+            requeue_unfinished (bool, optional): Queue jobs left running by an earlier
+                process again right away instead of when their lease expires. Only
+                safe with a single server process, since the jobs of other running
+                processes would be run twice. Defaults to False.
+        """
+        if self._tasks:
+            return
+        self._changed = asyncio.Event()
+        await asyncio.to_thread(self.store.purge)
+        if requeue_unfinished:
+            requeued = await asyncio.to_thread(self.store.requeue, self.kind, float("inf"))
+            if requeued:
+                print(f"Requeued {requeued} unfinished {self.kind} jobs")
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers. Jobs they were running are queued again once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, params: Dict[str, Any], key: str = None) -> Dict[str, Any]:
+        """Queue a job, or return the unfinished job with the same key.
+
+        Args:
+            params (Dict[str, Any]): JSON-serializable parameters of the handler.
+            key (str, optional): Identifies jobs producing the same result.
+                Defaults to None (never shared).
+
+        Returns:
+            Dict[str, Any]: The job.
+        """
+        job = await asyncio.to_thread(self.store.submit, self.kind, params, key)
+        self._notify()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a job of this queue.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job, or None if it does not exist.
+        """
+        job = await asyncio.to_thread(self.store.get, job_id)
+        return job if job is not None and job["kind"] == self.kind else None
+
+    async def wait(
+        self, job_id: str, timeout: float, status: str = None
+    ) -> Optional[Dict[str, Any]]:
+        """Wait until a job finishes or its status differs from ``status``.
+
+        Args:
+            job_id (str): The job id.
+            timeout (float): Maximum seconds to wait.
+            status (str, optional): The status the caller last saw. Defaults to None
+                (wait until the job is finished).
+
+        Returns:
+            Optional[Dict[str, Any]]: The job when it changed, finished or the timeout
+                passed, or None if it does not exist.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            if status is not None and job["status"] != status:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            # Jobs run by other processes only show up when polling the store.
+            await self._sleep(min(JOB_POLL_INTERVAL, remaining))
+
+
+job_store = JobStore()
@@ -0,0 +1,111 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from tools.cache import PersistentCache
+from tools.usage import current_caller
+
+
+DAY = 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Lifetime of cached responses in seconds, by caller (see tools.usage.llm_caller).
+# Only prompts whose answer is fully determined by their inputs are listed; calls
+# from other callers, such as the planning agents, always reach the model.
+LLM_CACHE_TTLS: Dict[str, Optional[float]] = {
+    "get_university_base_url": 180 * DAY,
+    "is_relevant_search_result": 30 * DAY,
+    "classify_relevance_batch": 30 * DAY,
+    "google_search_with_filter": 30 * DAY,
+    "extract_partner_universities": 30 * DAY,
+    "filter_partner_universities": 30 * DAY,
+    "extract_important_points": 7 * DAY,
+    "get_quotes_from_blog": 7 * DAY,
+    "make_markdown_from_plan": 30 * DAY,
+}
+
+
+class LLMResponseCache(BaseCache):
+    """Persistent exact-match cache of LLM responses.
+
+    Plugged into the chat model with ``cache=``, so every ``prompt | llm`` chain is
+    served from it without changes. Entries are keyed by the rendered prompt and the
+    model's llm_string, which holds the deployment and all call parameters. TTLs are
+    chosen per caller, and the least recently used entries are evicted once the cache
+    holds more than ``max_entries`` responses.
+    """
+    def __init__(
+        self,
+        ttls: Dict[str, Optional[float]] = None,
+        max_entries: Optional[int] = LLM_CACHE_MAX_ENTRIES,
+        path: str = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttls (Dict[str, Optional[float]], optional): Lifetime in seconds by caller
+                name, None for no expiry. Defaults to LLM_CACHE_TTLS.
+            max_entries (Optional[int], optional): Maximum number of cached responses.
+                Defaults to LLM_CACHE_MAX_ENTRIES.
+            path (str, optional): Path of the SQLite database file. Defaults to CACHE_DB_PATH.
+        """
+        self.ttls = LLM_CACHE_TTLS if ttls is None else ttls
+        self._cache = PersistentCache("llm_responses", max_entries=max_entries, path=path)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Return the cached generations for a prompt, or None on a miss.
+
+        Args:
+            prompt (str): The serialized prompt.
+            llm_string (str): The serialized model and call parameters.
+
+        Returns:
+            Optional[Sequence[Generation]]: The cached generations.
+        """
+        if current_caller() not in self.ttls:
+            return None
+        value = self._cache.get(self._key(prompt, llm_string))
+        if value is None:
+            return None
+        try:
+            generations = [loads(generation) for generation in value]
+        except Exception as e:
+            print(f"Error loading cached LLM response: {str(e)}")
+            return None
+        for generation in generations:
+            # A cached answer costs no tokens; don't report the original usage again.
+            message = getattr(generation, "message", None)
+            if message is not None and getattr(message, "usage_metadata", None):
+                message.usage_metadata = None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Store the generations for a prompt if its caller is cacheable.
+
+        Args:
+            prompt (str): The serialized prompt.
+            llm_string (str): The serialized model and call parameters.
+            return_val (Sequence[Generation]): The generations to cache.
+        """
+        caller = current_caller()
+        if caller not in self.ttls:
+            return
+        try:
+            value = [dumps(generation) for generation in return_val]
+        except Exception as e:
+            print(f"Error serializing LLM response for the cache: {str(e)}")
+            return
+        self._cache.set(self._key(prompt, llm_string), value, ttl=self.ttls[caller])
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove all cached responses."""
+        self._cache.clear()
+
+
+llm_cache = LLMResponseCache()
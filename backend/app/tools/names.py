@@ -0,0 +1,213 @@
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Optional
+
+
+# German transliterations, applied before accents are stripped so that
+# "Münster" and "Muenster" normalize to the same string.
+_TRANSLITERATIONS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def normalize_university_name(name: str) -> str:
+    """Normalize a university name for use as a lookup key.
+
+    Lowercases, transliterates umlauts, strips accents and punctuation and collapses
+    whitespace, e.g. "Universität Münster" becomes "universitaet muenster".
+
+    Args:
+        name (str): The university name.
+
+    Returns:
+        str: The normalized name.
+    """
+    text = name.strip().lower().translate(_TRANSLITERATIONS)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+# Generic words that do not identify a particular university, in English and the
+# local-language forms we commonly see, e.g. "Universidad de Granada".
+_GENERIC_WORDS = {
+    "the", "of", "university", "universitaet", "universitat", "universidad",
+    "universita", "universite", "universidade", "universiteit", "uniwersytet",
+    "uni", "de", "di", "du", "des", "der", "la", "le", "del", "degli", "zu",
+    "universitet", "universitatea", "univerzita", "yliopisto", "egyetem",
+    "studi", "y", "e", "and",
+}
+
+# Local-language word forms mapped to the English form, e.g. "Technische Universität
+# München" and "Technical University of Munich" both become "technical munich".
+_WORD_FORMS = {
+    "technische": "technical", "tecnica": "technical", "technique": "technical",
+    "politecnica": "polytechnic", "politecnico": "polytechnic", "polytechnique": "polytechnic",
+    "freie": "free", "libre": "free", "libera": "free",
+    "muenchen": "munich", "koeln": "cologne", "wien": "vienna", "zuerich": "zurich",
+    "geneve": "geneva", "milano": "milan", "roma": "rome", "firenze": "florence",
+    "napoli": "naples", "torino": "turin", "padova": "padua", "genova": "genoa",
+    "sevilla": "seville", "lisboa": "lisbon", "praha": "prague", "warszawa": "warsaw",
+    "krakow": "cracow", "bruxelles": "brussels", "kobenhavn": "copenhagen",
+    "goeteborg": "gothenburg", "goteborg": "gothenburg", "leuven": "leuven",
+}
+
+FUZZY_WORD_THRESHOLD = 0.8  # minimum similarity of two corresponding words
+FUZZY_MIN_WORD_LENGTH = 4  # shorter words, e.g. "sul" or "2", must match exactly
+
+_aliases: Dict[str, str] = {}
+_names: Dict[str, str] = {}
+
+
+def university_key(name: str) -> str:
+    """Return the canonical cache key of a university name.
+
+    Builds on normalize_university_name and additionally drops generic words such as
+    "University of" (also in local-language forms like "Universidad de") and maps
+    local word forms to English ones, so that "Muenster" and "University of Münster"
+    or "Universidad de Granada" and "Granada University" share a key. Registered
+    aliases (e.g. "WWU Münster") resolve to the key of their university.
+
+    Args:
+        name (str): The university name.
+
+    Returns:
+        str: The canonical key.
+    """
+    normalized = normalize_university_name(name)
+    words = [_WORD_FORMS.get(w, w) for w in normalized.split() if w not in _GENERIC_WORDS]
+    key = " ".join(words) or normalized
+    return _aliases.get(key, key)
+
+
+def register_name(name: str) -> None:
+    """Make a university name the canonical spelling of all names sharing its key.
+
+    Args:
+        name (str): The name, e.g. "University of Münster" from the gazetteer.
+    """
+    _names.setdefault(university_key(name), name.strip())
+
+
+def register_alias(alias: str, name: str) -> None:
+    """Make an alternative university name resolve to the key of another name.
+
+    Args:
+        alias (str): The alternative name, e.g. "WWU Münster".
+        name (str): The name it stands for, e.g. "University of Münster".
+    """
+    alias_key = university_key(alias)
+    target_key = university_key(name)
+    if alias_key != target_key:
+        _aliases[alias_key] = target_key
+
+
+def similar_university_keys(key: str, other: str) -> bool:
+    """Check whether two university keys are spelling variants of each other.
+
+    The keys must have the same number of words, and corresponding words must be
+    equal or, if both have at least FUZZY_MIN_WORD_LENGTH characters, at least
+    FUZZY_WORD_THRESHOLD similar. "muenster" and "munster" match, while
+    "northwestern switzerland" and "western switzerland" or "lyon 2" and "lyon 3" do not.
+
+    Args:
+        key (str): A key returned by university_key.
+        other (str): Another key returned by university_key.
+
+    Returns:
+        bool: Whether the keys name the same university.
+    """
+    words, other_words = key.split(), other.split()
+    if len(words) != len(other_words):
+        return False
+    for word, other_word in zip(words, other_words):
+        if word == other_word:
+            continue
+        if min(len(word), len(other_word)) < FUZZY_MIN_WORD_LENGTH:
+            return False
+        if SequenceMatcher(None, word, other_word).ratio() < FUZZY_WORD_THRESHOLD:
+            return False
+    return True
+
+
+class UniversityNameIndex:
+    """In-memory index mapping university name variants to one name.
+
+    Used to deduplicate the names collected for a single request. Names are matched
+    exactly on university_key first and otherwise with similar_university_keys
+    against every indexed name, so spelling variants such as "University of
+    Muenster" and "University of Munster" resolve to the name that was indexed
+    first. The result depends on the indexed names, so it must not be used for
+    persistent keys.
+    """
+    def __init__(self):
+        """Initialize an empty index."""
+        self._lock = threading.Lock()
+        self._names: Dict[str, str] = {}
+
+    def _match(self, key: str) -> Optional[str]:
+        if key in self._names:
+            return key
+        for candidate in self._names:
+            if similar_university_keys(key, candidate):
+                return candidate
+        return None
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the indexed name matching ``name``.
+
+        Args:
+            name (str): The university name.
+
+        Returns:
+            Optional[str]: The indexed name, or None if no indexed name matches.
+        """
+        with self._lock:
+            key = self._match(university_key(name))
+            return self._names[key] if key else None
+
+    def add(self, name: str) -> str:
+        """Index a name unless it matches an indexed university.
+
+        Args:
+            name (str): The university name.
+
+        Returns:
+            str: The matching indexed name, or ``name`` itself if it was added.
+        """
+        name = name.strip()
+        key = university_key(name)
+        with self._lock:
+            match = self._match(key)
+            if match:
+                return self._names[match]
+            self._names[key] = name
+            return name
+
+
+def canonical_university_name(name: str) -> str:
+    """Return the canonical spelling of a university name.
+
+    Args:
+        name (str): The university name.
+
+    Returns:
+        str: The registered name sharing its key (see register_name), or ``name``.
+    """
+    return _names.get(university_key(name), name.strip())
+
+
+def canonical_university_key(name: str) -> str:
+    """Return the cache key of a university name, shared by all of its known variants.
+
+    The key only depends on the name and the registered aliases, so it is stable
+    across processes and restarts and safe to use for persisted entries.
+
+    Args:
+        name (str): The university name.
+
+    Returns:
+        str: The canonical key.
+    """
+    return university_key(name)
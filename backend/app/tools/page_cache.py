@@ -0,0 +1,259 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+from tools.cache import PersistentCache
+from tools.gazetteer import gazetteer
+
+
+PAGE_CACHE_DIR = os.getenv(
+    "PAGE_CACHE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "pages",
+    ),
+)
+PAGE_CACHE_MAX_PAGES = 20000  # least recently used URLs are forgotten beyond this
+PAGE_CACHE_GC_INTERVAL = 60 * 60  # seconds between deletions of unreferenced page files
+PAGE_CACHE_GC_GRACE = 10 * 60  # files younger than this may still be getting referenced
+
+DAY = 24 * 60 * 60
+DEFAULT_MAX_AGE = 1 * DAY  # pages are revalidated after this long
+UNIVERSITY_MAX_AGE = 14 * DAY  # university pages, e.g. partner lists, change rarely
+
+# Seconds a cached page is served without revalidation, by domain. A domain also
+# covers its subdomains; the longest matching domain wins.
+DOMAIN_MAX_AGE: Dict[str, float] = {
+    "edu": UNIVERSITY_MAX_AGE,
+    "ac.uk": UNIVERSITY_MAX_AGE,
+    "ac.jp": UNIVERSITY_MAX_AGE,
+    "edu.au": UNIVERSITY_MAX_AGE,
+    "ac.at": UNIVERSITY_MAX_AGE,
+    "ac.za": UNIVERSITY_MAX_AGE,
+    **{domain: UNIVERSITY_MAX_AGE for domain in gazetteer.domains()},
+}
+
+
+@dataclass
+class CachedPage:
+    """Metadata of a cached page.
+
+    Attributes:
+        url (str): The page URL.
+        content_hash (str): SHA-256 of the raw response body, naming its files.
+        content_type (str): The Content-Type header of the response.
+        etag (Optional[str]): The ETag header, for revalidation.
+        last_modified (Optional[str]): The Last-Modified header, for revalidation.
+        fetched_at (float): When the body was last downloaded.
+        validated_at (float): When the body was last confirmed to be current.
+    """
+    url: str
+    content_hash: str
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    validated_at: float
+
+
+def max_age(url: str) -> float:
+    """Return how long a page may be served from the cache without revalidation.
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        float: The max-age in seconds from DOMAIN_MAX_AGE, or DEFAULT_MAX_AGE.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    labels = host.split(".")
+    for start in range(len(labels)):
+        domain = ".".join(labels[start:])
+        if domain in DOMAIN_MAX_AGE:
+            return DOMAIN_MAX_AGE[domain]
+    return DEFAULT_MAX_AGE
+
+
+class PageCache:
+    """Content-addressed on-disk cache of downloaded pages.
+
+    Raw response bodies and their extracted text are stored in files named by the
+    SHA-256 of the body, so identical pages share storage. Per-URL metadata with
+    the body hash and the ETag/Last-Modified validators is kept in a
+    PersistentCache. Pages are served locally while younger than their domain's
+    max-age and revalidated with a conditional request afterwards. Files no URL
+    refers to anymore, e.g. after LRU eviction, are deleted by collect_garbage,
+    which store runs at most every PAGE_CACHE_GC_INTERVAL seconds.
+    """
+    def __init__(self, directory: str = PAGE_CACHE_DIR, max_pages: int = PAGE_CACHE_MAX_PAGES):
+        """Initialize the cache.
+
+        Args:
+            directory (str, optional): Directory of the page files. Defaults to PAGE_CACHE_DIR.
+            max_pages (int, optional): Maximum number of URLs remembered.
+                Defaults to PAGE_CACHE_MAX_PAGES.
+        """
+        self.directory = directory
+        self._pages = PersistentCache("page_cache", max_entries=max_pages)
+        self._gc_lock = threading.Lock()
+        self._collected_at = time.time()
+
+    def _path(self, content_hash: str, suffix: str = "") -> str:
+        return os.path.join(self.directory, content_hash[:2], content_hash + suffix)
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Written to a temporary file first, so readers never see a partial file.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """Return the metadata of a cached page.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            Optional[CachedPage]: The metadata, or None if the page is not cached.
+        """
+        page = self._pages.get(url)
+        return None if page is None else CachedPage(**page)
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        """Check whether a page may be served without revalidation.
+
+        Args:
+            page (CachedPage): The cached page.
+
+        Returns:
+            bool: True if the page was validated within its domain's max-age.
+        """
+        return time.time() - page.validated_at < max_age(page.url)
+
+    def read_text(self, page: CachedPage) -> Optional[str]:
+        """Read the extracted text of a cached page.
+
+        Args:
+            page (CachedPage): The cached page.
+
+        Returns:
+            Optional[str]: The text, or None if its file is missing.
+        """
+        try:
+            with open(self._path(page.content_hash, ".txt"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def validators(self, page: CachedPage) -> Dict[str, str]:
+        """Build the headers of a conditional request for a cached page.
+
+        Args:
+            page (CachedPage): The cached page.
+
+        Returns:
+            Dict[str, str]: If-None-Match and/or If-Modified-Since headers.
+        """
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def revalidated(self, page: CachedPage, headers: Mapping[str, str]) -> CachedPage:
+        """Record that the server confirmed a cached page is current (304 Not Modified).
+
+        Args:
+            page (CachedPage): The cached page.
+            headers (Mapping[str, str]): Headers of the 304 response.
+
+        Returns:
+            CachedPage: The updated metadata.
+        """
+        page.etag = headers.get("ETag") or page.etag
+        page.last_modified = headers.get("Last-Modified") or page.last_modified
+        page.validated_at = time.time()
+        self._pages.set(page.url, asdict(page))
+        return page
+
+    def store(self, url: str, body: bytes, text: str, headers: Mapping[str, str]) -> CachedPage:
+        """Store a downloaded page.
+
+        Args:
+            url (str): The page URL.
+            body (bytes): The raw response body.
+            text (str): The text extracted from the body.
+            headers (Mapping[str, str]): Headers of the response.
+
+        Returns:
+            CachedPage: The metadata of the stored page.
+        """
+        content_hash = hashlib.sha256(body).hexdigest()
+        try:
+            # Marks existing files as recently used, so collect_garbage keeps them.
+            os.utime(self._path(content_hash))
+            os.utime(self._path(content_hash, ".txt"))
+        except OSError:
+            self._write(self._path(content_hash), body)
+            self._write(self._path(content_hash, ".txt"), text.encode("utf-8"))
+        now = time.time()
+        page = CachedPage(
+            url=url,
+            content_hash=content_hash,
+            content_type=headers.get("Content-Type", ""),
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            fetched_at=now,
+            validated_at=now,
+        )
+        self._pages.set(url, asdict(page))
+        if now - self._collected_at >= PAGE_CACHE_GC_INTERVAL:
+            self.collect_garbage()
+        return page
+
+    def collect_garbage(self) -> int:
+        """Delete the page files that no cached URL refers to.
+
+        Files modified within PAGE_CACHE_GC_GRACE are kept, since a concurrent store
+        may have written them without recording its metadata yet.
+
+        Returns:
+            int: The number of deleted files.
+        """
+        if not self._gc_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._collected_at = time.time()
+            referenced = {page["content_hash"] for _, page in self._pages.items()}
+            deleted = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        if name.split(".")[0] in referenced:
+                            continue
+                        if time.time() - os.path.getmtime(path) < PAGE_CACHE_GC_GRACE:
+                            continue
+                        os.unlink(path)
+                        deleted += 1
+                    except OSError:
+                        continue
+            print(f"Deleted {deleted} unreferenced page files")
+            return deleted
+        finally:
+            self._gc_lock.release()
+
+
+page_cache = PageCache()
@@ -0,0 +1,252 @@
+import base64
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from tools.cache import PersistentCache
+from tools.chunking import CHUNK_SEPARATOR, count_tokens, split_into_chunks
+from tools.semantic_cache import get_embeddings, similarity_threshold
+
+
+PAGE_STORE_TTL = 7 * 24 * 60 * 60  # pages are fetched again after a week
+PAGE_STORE_MAX_PAGES = 2000  # least recently used pages are evicted beyond this
+# Chunks less similar to the query are ignored. Deployment embeddings rate unrelated
+# texts much higher than HashingEmbeddings; tune with PAGE_RETRIEVAL_MIN_SIMILARITY.
+PAGE_RETRIEVAL_MIN_SIMILARITY = similarity_threshold(
+    "PAGE_RETRIEVAL_MIN_SIMILARITY", hashing=0.3, deployment=0.5
+)
+PAGE_STORE_PRUNE_INTERVAL = 10 * 60  # seconds between searches dropping expired pages
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageStore:
+    """Local retrieval corpus of every page the backend has fetched.
+
+    The chunks of each page are persisted in a PersistentCache together with their
+    embeddings and a hash of the page text, and indexed in FAISS for retrieval
+    across pages. The page text itself is kept only by the page cache. Pages
+    evicted from the PersistentCache or expired are removed from the index as well,
+    after every added page and at most every PAGE_STORE_PRUNE_INTERVAL seconds on
+    search. Callers whose fetch fails can still answer from related chunks of
+    other pages.
+    """
+    def __init__(
+        self,
+        ttl: Optional[float] = PAGE_STORE_TTL,
+        max_pages: Optional[int] = PAGE_STORE_MAX_PAGES,
+        embeddings: Embeddings = None,
+        path: str = None,
+    ):
+        """Initialize the store.
+
+        Args:
+            ttl (Optional[float], optional): Lifetime of a page in seconds.
+                Defaults to PAGE_STORE_TTL.
+            max_pages (Optional[int], optional): Maximum number of stored pages.
+                Defaults to PAGE_STORE_MAX_PAGES.
+            embeddings (Embeddings, optional): The embedding model. Defaults to
+                get_embeddings(), created on first use.
+            path (str, optional): Path of the SQLite database file. Defaults to CACHE_DB_PATH.
+        """
+        self._embeddings = embeddings
+        self._pages = PersistentCache("pages", ttl=ttl, path=path, max_entries=max_pages)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._index: Optional[faiss.Index] = None
+        self._chunks: Dict[int, Tuple[str, str]] = {}  # chunk id -> (url, chunk)
+        self._chunk_ids: Dict[str, List[int]] = {}  # url -> chunk ids
+        self._next_id = 0
+        self._pruned_at = 0.0
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    @property
+    def _model(self) -> str:
+        embeddings = self.embeddings
+        return str(
+            getattr(embeddings, "deployment", None)
+            or getattr(embeddings, "model", None)
+            or type(embeddings).__name__
+        )
+
+    def _remove_page(self, url: str) -> None:
+        # Caller holds self._lock.
+        ids = self._chunk_ids.pop(url, [])
+        if ids and self._index is not None:
+            self._index.remove_ids(np.asarray(ids, dtype=np.int64))
+        for chunk_id in ids:
+            self._chunks.pop(chunk_id, None)
+
+    def _prune(self) -> None:
+        # Caller holds self._lock. Drops the chunks of pages that are no longer stored.
+        self._pruned_at = time.time()
+        stored = set(self._pages.keys())
+        for url in [url for url in self._chunk_ids if url not in stored]:
+            self._remove_page(url)
+
+    def _index_page(self, url: str, chunks: List[str], vectors: np.ndarray) -> None:
+        # Caller holds self._lock. Replaces the chunks of an earlier version of the page.
+        self._remove_page(url)
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        if vectors.shape[1] != self._index.d:
+            return
+        ids = np.arange(self._next_id, self._next_id + len(chunks), dtype=np.int64)
+        self._next_id += len(chunks)
+        self._index.add_with_ids(vectors, ids)
+        for chunk_id, chunk in zip(ids.tolist(), chunks):
+            self._chunks[chunk_id] = (url, chunk)
+        self._chunk_ids[url] = ids.tolist()
+
+    def _load(self) -> None:
+        # Caller holds self._lock. Pages embedded by another model are not indexed.
+        if self._loaded:
+            return
+        self._loaded = True
+        model = self._model
+        for url, page in self._pages.items():
+            if page.get("model") != model or not page["chunks"]:
+                continue
+            vectors = np.frombuffer(
+                base64.b64decode(page["vectors"]), dtype=np.float32
+            ).reshape(len(page["chunks"]), -1)
+            self._index_page(url, page["chunks"], vectors)
+
+    def is_current(self, url: str, text: str) -> bool:
+        """Check whether a page is stored with the given text.
+
+        Args:
+            url (str): The page URL.
+            text (str): The extracted page text.
+
+        Returns:
+            bool: False if the page is not stored, expired or stored with another text.
+        """
+        page = self._pages.get(url)
+        return page is not None and page.get("text_hash") == _text_hash(text)
+
+    def add_page(self, url: str, text: str) -> None:
+        """Store a fetched page and index its chunks.
+
+        Args:
+            url (str): The page URL.
+            text (str): The extracted page text.
+        """
+        chunks = split_into_chunks(text)
+        if chunks:
+            vectors = np.asarray(self.embeddings.embed_documents(chunks), dtype=np.float32)
+            faiss.normalize_L2(vectors)
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        self._pages.set(
+            url,
+            {
+                "text_hash": _text_hash(text),
+                "model": self._model,
+                "chunks": chunks,
+                "vectors": base64.b64encode(vectors.tobytes()).decode("ascii"),
+            },
+        )
+        with self._lock:
+            self._load()
+            if chunks:
+                self._index_page(url, chunks, vectors)
+            else:
+                self._remove_page(url)
+            self._prune()
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        min_similarity: float = PAGE_RETRIEVAL_MIN_SIMILARITY,
+        url_filter: Callable[[str], bool] = None,
+    ) -> List[Tuple[float, str, str]]:
+        """Find the stored chunks most similar to a query, across all pages.
+
+        Args:
+            query (str): The query.
+            k (int, optional): Maximum number of chunks to return. Defaults to 5.
+            min_similarity (float, optional): Minimum cosine similarity of a chunk.
+                Defaults to PAGE_RETRIEVAL_MIN_SIMILARITY.
+            url_filter (Callable[[str], bool], optional): Restricts the search to the
+                pages whose URL it accepts. Defaults to None (all pages).
+
+        Returns:
+            List[Tuple[float, str, str]]: (similarity, url, chunk), most similar first.
+        """
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        with self._lock:
+            self._load()
+            if time.time() - self._pruned_at >= PAGE_STORE_PRUNE_INTERVAL:
+                self._prune()
+            if self._index is None or not self._index.ntotal or vector.shape[1] != self._index.d:
+                return []
+            if url_filter is None:
+                similarities, ids = self._index.search(vector, min(k, self._index.ntotal))
+                matches = zip(similarities[0].tolist(), ids[0].tolist())
+            else:
+                # Scores the accepted pages' chunks directly instead of filtering the
+                # global top k, which may not contain any of them.
+                ids = [
+                    chunk_id
+                    for url, chunk_ids in self._chunk_ids.items() if url_filter(url)
+                    for chunk_id in chunk_ids
+                ]
+                if not ids:
+                    return []
+                similarities = np.vstack([self._index.reconstruct(i) for i in ids]) @ vector[0]
+                order = np.argsort(-similarities)[:k].tolist()
+                matches = [(float(similarities[i]), ids[i]) for i in order]
+            return [
+                (similarity, *self._chunks[chunk_id])
+                for similarity, chunk_id in matches
+                if chunk_id != -1 and similarity >= min_similarity
+            ]
+
+    def relevant_text(
+        self,
+        query: str,
+        max_tokens: int,
+        k: int = 20,
+        url_filter: Callable[[str], bool] = None,
+    ) -> Tuple[str, List[str]]:
+        """Collect the stored chunks most relevant to a query, within a token budget.
+
+        Args:
+            query (str): The query.
+            max_tokens (int): Maximum number of tokens to return.
+            k (int, optional): Number of chunks considered. Defaults to 20.
+            url_filter (Callable[[str], bool], optional): Restricts the chunks to the
+                pages whose URL it accepts. Defaults to None (all pages).
+
+        Returns:
+            Tuple[str, List[str]]: The selected chunks, joined by CHUNK_SEPARATOR and
+                empty if none matched, and the URLs of the pages they come from.
+        """
+        selected = []
+        urls = []
+        budget = max_tokens
+        for _, url, chunk in self.search(query, k=k, url_filter=url_filter):
+            tokens = count_tokens(chunk) + 1
+            if tokens > budget:
+                continue
+            selected.append(chunk)
+            if url not in urls:
+                urls.append(url)
+            budget -= tokens
+        return CHUNK_SEPARATOR.join(selected), urls
+
+
+page_store = PageStore()
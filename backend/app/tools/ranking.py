@@ -0,0 +1,158 @@
+from typing import Any, Dict, List
+import numpy as np
+
+
+# Minimum GPA (4.0 scale) considered sufficient per ranking category
+GPA_THRESHOLDS = {"high": 3.5, "mid": 3.0, "low": 2.5}
+GPA_SOFTNESS = 0.25  # GPA points over which the score moves from ~0.27 to ~0.73
+
+# Typical monthly living costs for students in EUR, by country
+MONTHLY_COST_OF_LIVING = {
+    "Germany": 950, "Spain": 850, "Italy": 900, "France": 1100, "Belgium": 1000,
+    "Netherlands": 1150, "Switzerland": 1900, "Austria": 1000, "Denmark": 1250,
+    "Sweden": 1100, "Finland": 1000, "Norway": 1350, "Portugal": 750,
+    "Czech Republic": 700, "Poland": 650, "Ireland": 1350, "United Kingdom": 1300,
+    "United States": 1700, "Canada": 1350, "Australia": 1450, "Japan": 1100,
+    "Singapore": 1400, "South Africa": 650, "Brazil": 600, "Mexico": 600,
+}
+DEFAULT_MONTHLY_COST = 1100
+
+# Months in which exchange terms typically start, by country
+TERM_START_MONTHS = {
+    "Australia": (2, 3, 7, 8),
+    "South Africa": (2, 7),
+    "Brazil": (2, 3, 8),
+    "Japan": (4, 9, 10),
+    "Singapore": (1, 8),
+}
+DEFAULT_TERM_START_MONTHS = (2, 3, 9, 10)
+
+WEIGHTS = {"language": 0.35, "gpa": 0.25, "budget": 0.2, "term": 0.2}
+
+
+def _month_distance(months: np.ndarray, month: int) -> np.ndarray:
+    """Circular distance in months between each of ``months`` and ``month``."""
+    difference = np.abs(months - month) % 12
+    return np.minimum(difference, 12 - difference)
+
+
+def has_information(university: Dict[str, Any]) -> bool:
+    """Check whether university details contain anything to match a student against.
+
+    Args:
+        university (Dict[str, Any]): University details.
+
+    Returns:
+        bool: False for rows without languages, country and a known ranking, such as
+            the "Information unavailable" fallback.
+    """
+    return bool(
+        university.get("languages")
+        or university.get("country")
+        or university.get("ranking") in GPA_THRESHOLDS
+    )
+
+
+def score_universities(universities: List[Dict[str, Any]], criteria: Dict[str, Any]) -> np.ndarray:
+    """Score how well each university matches a student's criteria, in one vectorized pass.
+
+    Four sub-scores between 0 and 1 are combined with WEIGHTS:
+        - language: whether the university teaches in a language the student speaks
+        - gpa: the student's GPA against the threshold for the university's ranking
+        - budget: the student's monthly budget against the country's cost of living
+        - term: how close the student's start month is to a term start in the country
+
+    Missing student criteria score neutrally (1.0). Universities without known
+    languages score 0.5 on language, and unknown rankings fall back to the "mid"
+    GPA threshold. A given budget or start month is left out for universities
+    without a country, with the remaining weights rescaled; countries missing from
+    the tables use the default cost of living and term months. Rows without any
+    information (see has_information) score 0, so they never outrank a real match.
+
+    Args:
+        universities (List[Dict[str, Any]]): University details with "languages",
+            "ranking" and optionally "country".
+        criteria (Dict[str, Any]): Student criteria with "languages", "gpa" and
+            optionally "budget" (monthly, in EUR) and "start_month".
+
+    Returns:
+        np.ndarray: One score between 0 and 1 per university.
+    """
+    if not universities:
+        return np.zeros(0)
+
+    spoken = {language.strip().lower() for language in criteria.get("languages") or []}
+    countries = [u.get("country") for u in universities]
+
+    known_languages = np.array([bool(u.get("languages")) for u in universities])
+    language_match = np.array(
+        [any(l.strip().lower() in spoken for l in u.get("languages") or []) for u in universities]
+    )
+    language = np.where(known_languages, language_match.astype(float), 0.5)
+
+    required_gpa = np.array(
+        [GPA_THRESHOLDS.get(u.get("ranking"), GPA_THRESHOLDS["mid"]) for u in universities]
+    )
+    gpa = criteria.get("gpa")
+    if gpa is None:
+        gpa_score = np.ones(len(universities))
+    else:
+        gpa_score = 1 / (1 + np.exp(-(gpa - required_gpa) / GPA_SOFTNESS))
+
+    budget = criteria.get("budget")
+    if budget is None:
+        budget_score = np.ones(len(universities))
+    else:
+        costs = np.array(
+            [MONTHLY_COST_OF_LIVING.get(country, DEFAULT_MONTHLY_COST) for country in countries],
+            dtype=float,
+        )
+        budget_score = np.clip(budget / costs, 0, 1) ** 2
+
+    start_month = criteria.get("start_month")
+    if start_month is None:
+        term_score = np.ones(len(universities))
+    else:
+        # One row of term start months per university, padded with NaN.
+        term_months = np.full((len(universities), 4), np.nan)
+        for row, country in enumerate(countries):
+            months = TERM_START_MONTHS.get(country, DEFAULT_TERM_START_MONTHS)
+            term_months[row, : len(months)] = months
+        distances = np.nanmin(_month_distance(term_months, start_month), axis=1)
+        term_score = np.clip(1 - np.maximum(distances - 1, 0) / 5, 0, 1)
+
+    # Budget and term depend on the country, so a given budget or start month only
+    # counts for universities whose country is known.
+    known_country = np.array([bool(country) for country in countries], dtype=float)
+    budget_weight = WEIGHTS["budget"] * (known_country if budget is not None else 1.0)
+    term_weight = WEIGHTS["term"] * (known_country if start_month is not None else 1.0)
+    scores = (
+        WEIGHTS["language"] * language
+        + WEIGHTS["gpa"] * gpa_score
+        + budget_weight * budget_score
+        + term_weight * term_score
+    ) / (WEIGHTS["language"] + WEIGHTS["gpa"] + budget_weight + term_weight)
+    informed = np.array([has_information(u) for u in universities], dtype=bool)
+    return np.where(informed, scores, 0.0)
+
+
+def rank_universities(
+    universities: List[Dict[str, Any]], criteria: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Sort universities by how well they match a student's criteria.
+
+    Args:
+        universities (List[Dict[str, Any]]): University details.
+        criteria (Dict[str, Any]): Student criteria (see score_universities).
+
+    Returns:
+        List[Dict[str, Any]]: Copies of the university details with a "match_score"
+            between 0 and 1, best match first and rows without information last.
+            Ties keep their original order.
+    """
+    scores = score_universities(universities, criteria)
+    informed = np.array([has_information(u) for u in universities], dtype=bool)
+    order = np.lexsort((-scores, ~informed))
+    return [
+        {**universities[i], "match_score": round(float(scores[i]), 3)} for i in order
+    ]
@@ -0,0 +1,86 @@
+import re
+from typing import Dict, List, Optional
+from langchain.prompts import ChatPromptTemplate
+from tools.usage import llm_caller
+from tools.utils import llm
+
+
+BATCH_RELEVANCE_TEMPLATE = """
+{criteria}
+
+Evaluate each of the following search results against the criteria above.
+
+{results}
+
+Respond with exactly one line per search result in the format "<index>: YES" if the
+result is relevant or "<index>: NO" if it is not, for example "0: YES".
+Return nothing else.
+"""
+
+_VERDICT_PATTERN = re.compile(r"^\W*\[?(\d+)\]?\s*[:.)\-]\s*\**\s*(YES|NO)\b", re.IGNORECASE)
+
+
+def format_search_results(results: List[Dict[str, str]]) -> str:
+    """Render search results as an indexed list for a batched prompt.
+
+    Args:
+        results (List[Dict[str, str]]): Search results with 'title' and 'snippet' keys.
+
+    Returns:
+        str: One indexed block per search result.
+    """
+    return "\n\n".join(
+        f"[{index}]\nTitle: {result['title']}\nDescription: {result['snippet']}"
+        for index, result in enumerate(results)
+    )
+
+
+def parse_relevance_verdicts(text: str, count: int) -> List[Optional[bool]]:
+    """Parse "<index>: YES|NO" lines returned by the model.
+
+    Args:
+        text (str): The raw model response.
+        count (int): Number of search results that were classified.
+
+    Returns:
+        List[Optional[bool]]: One verdict per index, None where the model gave no answer.
+    """
+    verdicts: List[Optional[bool]] = [None] * count
+    for line in text.splitlines():
+        match = _VERDICT_PATTERN.match(line.strip())
+        if not match:
+            continue
+        index = int(match.group(1))
+        if 0 <= index < count and verdicts[index] is None:
+            verdicts[index] = match.group(2).upper() == "YES"
+    return verdicts
+
+
+@llm_caller("classify_relevance_batch")
+async def aclassify_relevance_batch(
+    results: List[Dict[str, str]], criteria: str
+) -> List[Optional[bool]]:
+    """Classify all search results against the criteria in a single LLM call.
+
+    Args:
+        results (List[Dict[str, str]]): Search results with 'title' and 'snippet' keys.
+        criteria (str): Instructions describing what makes a result relevant.
+
+    Returns:
+        List[Optional[bool]]: One verdict per search result, None where the model's
+            answer was missing or the call failed so callers can fall back.
+    """
+    if not results:
+        return []
+
+    prompt = ChatPromptTemplate.from_template(BATCH_RELEVANCE_TEMPLATE)
+    chain = prompt | llm
+    try:
+        response = await chain.ainvoke(
+            {"criteria": criteria, "results": format_search_results(results)}
+        )
+    except Exception as e:
+        print(f"Error classifying search results in batch: {str(e)}")
+        return [None] * len(results)
+
+    return parse_relevance_verdicts(response.content, len(results))
@@ -0,0 +1,257 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, Optional
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from tools.cache import PersistentCache
+from tools.names import normalize_university_name
+
+
+HASHING_DIMENSIONS = 512
+SEMANTIC_CACHE_CANDIDATES = 8  # nearest entries inspected per lookup
+EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+
+
+def similarity_threshold(name: str, hashing: float, deployment: float) -> float:
+    """Return a cosine similarity threshold for the configured embedding backend.
+
+    Similarities of the same texts differ a lot between embedding models, so a
+    threshold tuned for HashingEmbeddings means something else for a deployment.
+    Each threshold therefore has a default per backend, and the environment
+    variable ``name`` overrides it for the configured one.
+
+    Args:
+        name (str): Name of the threshold and of its environment variable.
+        hashing (float): Default for HashingEmbeddings.
+        deployment (float): Default for AZURE_OPENAI_EMBEDDING_DEPLOYMENT.
+
+    Returns:
+        float: The threshold.
+    """
+    value = os.getenv(name)
+    if value:
+        return float(value)
+    return deployment if EMBEDDING_DEPLOYMENT else hashing
+
+
+# Minimum cosine similarity for a hit
+SEMANTIC_CACHE_THRESHOLD = similarity_threshold(
+    "SEMANTIC_CACHE_THRESHOLD", hashing=0.9, deployment=0.97
+)
+
+
+class HashingEmbeddings(Embeddings):
+    """Local, deterministic embeddings from hashed words and character trigrams.
+
+    Needs no model or network access, so it is the default when no embedding
+    deployment is configured. Texts that differ only in spelling, inflection or
+    word order, such as "Computer Science" and "computer sciences", land close
+    together.
+    """
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        """Initialize the embedder.
+
+        Args:
+            dimensions (int, optional): Size of the vectors. Defaults to HASHING_DIMENSIONS.
+        """
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        words = normalize_university_name(text).split()
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f" {word} "
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embeddings() -> Embeddings:
+    """Return the embeddings used by semantic caches.
+
+    Uses the Azure OpenAI deployment named by AZURE_OPENAI_EMBEDDING_DEPLOYMENT if
+    set, and HashingEmbeddings otherwise.
+
+    Returns:
+        Embeddings: The embedding model.
+    """
+    if EMBEDDING_DEPLOYMENT:
+        from langchain_openai import AzureOpenAIEmbeddings
+
+        return AzureOpenAIEmbeddings(
+            azure_deployment=EMBEDDING_DEPLOYMENT,
+            openai_api_key=os.environ["AZURE_OPENAI_API_KEY"],
+            azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
+            openai_api_version=os.getenv("AZURE_OPENAI_EMBEDDING_API_VERSION", "2023-05-15"),
+        )
+    return HashingEmbeddings()
+
+
+class SemanticCache:
+    """Cache serving stored answers for questions phrased similarly to earlier ones.
+
+    Question embeddings are indexed in FAISS and the answers persisted in a
+    PersistentCache, from which the index is rebuilt on first use. A lookup returns
+    the answer of the most similar earlier question within the same ``scope`` if
+    their cosine similarity reaches ``threshold``. Scopes let callers require an
+    exact match on part of the question, e.g. the universities of a plan, and
+    compare only the free-text rest semantically.
+
+    Attributes:
+        threshold (float): Minimum cosine similarity for a hit.
+        embeddings (Embeddings): The embedding model.
+    """
+    def __init__(
+        self,
+        namespace: str,
+        ttl: Optional[float] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        embeddings: Embeddings = None,
+        path: str = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            namespace (str): Name of the persistent store of this cache.
+            ttl (Optional[float], optional): Lifetime of an answer in seconds.
+                Defaults to None (no expiry).
+            threshold (float, optional): Minimum cosine similarity for a hit.
+                Defaults to SEMANTIC_CACHE_THRESHOLD.
+            embeddings (Embeddings, optional): The embedding model. Defaults to
+                get_embeddings(), created on first use.
+            path (str, optional): Path of the SQLite database file. Defaults to CACHE_DB_PATH.
+        """
+        self.threshold = threshold
+        self._embeddings = embeddings
+        self._store = PersistentCache(f"semantic:{namespace}", ttl=ttl, path=path)
+        self._lock = threading.Lock()
+        self._loaded = False
+        # One FAISS index and its entry keys per scope.
+        self._indexes: Dict[str, faiss.Index] = {}
+        self._keys: Dict[str, List[str]] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    @property
+    def _model(self) -> str:
+        embeddings = self.embeddings
+        return str(
+            getattr(embeddings, "deployment", None)
+            or getattr(embeddings, "model", None)
+            or type(embeddings).__name__
+        )
+
+    @staticmethod
+    def _key(text: str, scope: str) -> str:
+        return hashlib.sha256(f"{scope}\n{text}".encode("utf-8")).hexdigest()
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.asarray([self.embeddings.embed_query(text)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _add(self, key: str, scope: str, vector: np.ndarray) -> None:
+        # Caller holds self._lock.
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = faiss.IndexFlatIP(vector.shape[1])
+            self._keys[scope] = []
+        if vector.shape[1] != index.d or key in self._keys[scope]:
+            return
+        index.add(vector)
+        self._keys[scope].append(key)
+
+    def _load(self) -> None:
+        # Caller holds self._lock. Entries embedded by another model are skipped.
+        if self._loaded:
+            return
+        self._loaded = True
+        model = self._model
+        for key, entry in self._store.items():
+            if entry.get("model") != model:
+                continue
+            self._add(key, entry["scope"], np.asarray([entry["vector"]], dtype=np.float32))
+
+    def lookup(self, text: str, scope: str = "") -> Optional[Any]:
+        """Return the stored answer of the most similar earlier question.
+
+        Args:
+            text (str): The question.
+            scope (str, optional): Only questions stored with the same scope match.
+                Defaults to "".
+
+        Returns:
+            Optional[Any]: The stored answer, or None if no question is similar enough.
+        """
+        vector = self._vector(text)
+        with self._lock:
+            self._load()
+            index = self._indexes.get(scope)
+            if index is None or not index.ntotal or vector.shape[1] != index.d:
+                return None
+            similarities, positions = index.search(
+                vector, min(SEMANTIC_CACHE_CANDIDATES, index.ntotal)
+            )
+            candidates = [
+                self._keys[scope][position]
+                for similarity, position in zip(similarities[0], positions[0])
+                if position != -1 and similarity >= self.threshold
+            ]
+        for key in candidates:
+            entry = self._store.get(key)
+            if entry is not None:
+                return entry["value"]
+        return None
+
+    def update(self, text: str, value: Any, scope: str = "") -> None:
+        """Store the answer to a question.
+
+        Args:
+            text (str): The question.
+            value (Any): A JSON-serializable answer.
+            scope (str, optional): Scope the question belongs to. Defaults to "".
+        """
+        vector = self._vector(text)
+        key = self._key(text, scope)
+        self._store.set(
+            key,
+            {
+                "text": text,
+                "scope": scope,
+                "model": self._model,
+                "vector": vector[0].tolist(),
+                "value": value,
+            },
+        )
+        with self._lock:
+            self._load()
+            self._add(key, scope, vector)
+
+    def clear(self) -> None:
+        """Remove all stored answers."""
+        self._store.clear()
+        with self._lock:
+            self._loaded = True
+            self._indexes = {}
+            self._keys = {}
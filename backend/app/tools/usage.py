@@ -0,0 +1,246 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+MAX_RECORDS = 10000  # most recent LLM calls kept in memory
+
+# USD per 1000 tokens as (prompt, completion), by model/deployment name.
+PRICES_PER_1K_TOKENS = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+}
+
+_caller: contextvars.ContextVar[str] = contextvars.ContextVar("llm_caller", default="unknown")
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("llm_endpoint", default="")
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("llm_request_id", default="")
+
+
+def llm_caller(name: str) -> Callable:
+    """Attribute all LLM calls made inside the decorated function to ``name``.
+
+    Nested callers take precedence, so a tool called by an agent is reported under
+    the tool's name. Works for both regular and async functions.
+
+    Args:
+        name (str): The caller name used in usage reports.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                token = _caller.set(name)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _caller.reset(token)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _caller.set(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _caller.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def usage_scope(endpoint: str, request_id: str = None) -> Iterator[str]:
+    """Attribute all LLM calls made inside the block to an API endpoint and request.
+
+    Args:
+        endpoint (str): The endpoint, e.g. "/search_universities".
+        request_id (str, optional): The request id. Defaults to a new UUID.
+
+    Yields:
+        str: The request id.
+    """
+    request_id = request_id or uuid.uuid4().hex
+    endpoint_token = _endpoint.set(endpoint)
+    request_token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(request_token)
+        _endpoint.reset(endpoint_token)
+
+
+def current_caller() -> str:
+    """Return the caller name LLM calls are currently attributed to.
+
+    Returns:
+        str: The caller name.
+    """
+    return _caller.get()
+
+
+class UsageTracker(BaseCallbackHandler):
+    """LangChain callback handler recording tokens, latency and cost of every LLM call.
+
+    Each call is attributed to the caller, endpoint and request active when it was
+    made (see llm_caller and usage_scope).
+    """
+    def __init__(self, max_records: int = MAX_RECORDS):
+        """Initialize the tracker.
+
+        Args:
+            max_records (int, optional): Number of recent calls to keep. Defaults to MAX_RECORDS.
+        """
+        self._lock = threading.Lock()
+        self._pending: Dict[UUID, Dict[str, Any]] = {}
+        self.records: deque = deque(maxlen=max_records)
+
+    def _start(self, run_id: UUID, serialized: Dict[str, Any], kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        deployment = (
+            params.get("deployment_name")
+            or params.get("azure_deployment")
+            or params.get("model")
+            or params.get("model_name")
+            or (serialized or {}).get("kwargs", {}).get("deployment_name", "")
+        )
+        with self._lock:
+            self._pending[run_id] = {
+                "caller": _caller.get(),
+                "endpoint": _endpoint.get(),
+                "request_id": _request_id.get(),
+                "deployment": deployment,
+                "started_at": time.time(),
+                "start": time.perf_counter(),
+            }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+        if not token_usage:
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        prompt_tokens += usage.get("input_tokens", 0)
+                        completion_tokens += usage.get("output_tokens", 0)
+        self._finish(run_id, prompt_tokens, completion_tokens, llm_output.get("model_name"))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._finish(run_id, 0, 0, None, error=str(error))
+
+    def _finish(
+        self,
+        run_id: UUID,
+        prompt_tokens: int,
+        completion_tokens: int,
+        model: Optional[str],
+        error: str = None,
+    ) -> None:
+        with self._lock:
+            record = self._pending.pop(run_id, None)
+            if record is None:
+                return
+            record["latency"] = time.perf_counter() - record.pop("start")
+            record["model"] = model or record["deployment"]
+            record["prompt_tokens"] = prompt_tokens
+            record["completion_tokens"] = completion_tokens
+            record["cost"] = estimate_cost(record["model"], prompt_tokens, completion_tokens)
+            record["error"] = error
+            self.records.append(record)
+
+    def get_records(self, request_id: str = None) -> List[Dict[str, Any]]:
+        """Return the recorded LLM calls, optionally for a single request.
+
+        Args:
+            request_id (str, optional): Only return calls made for this request.
+                Defaults to None (all calls).
+
+        Returns:
+            List[Dict[str, Any]]: The recorded calls, oldest first.
+        """
+        with self._lock:
+            records = list(self.records)
+        if request_id is not None:
+            records = [r for r in records if r["request_id"] == request_id]
+        return records
+
+    def summarize(self, group_by: str = "endpoint", request_id: str = None) -> Dict[str, Dict[str, Any]]:
+        """Aggregate the recorded LLM calls.
+
+        Args:
+            group_by (str, optional): Record field to group by: "endpoint", "caller",
+                "request_id", "deployment" or "model". Defaults to "endpoint".
+            request_id (str, optional): Only aggregate calls made for this request.
+                Defaults to None (all calls).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per group: calls, errors, prompt_tokens,
+                completion_tokens, total_tokens, cost, total_latency and avg_latency.
+        """
+        groups: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "cost": 0.0,
+                "total_latency": 0.0,
+            }
+        )
+        for record in self.get_records(request_id):
+            group = groups[record.get(group_by) or "unknown"]
+            group["calls"] += 1
+            group["errors"] += 1 if record["error"] else 0
+            group["prompt_tokens"] += record["prompt_tokens"]
+            group["completion_tokens"] += record["completion_tokens"]
+            group["total_tokens"] += record["prompt_tokens"] + record["completion_tokens"]
+            group["cost"] += record["cost"]
+            group["total_latency"] += record["latency"]
+        for group in groups.values():
+            group["avg_latency"] = group["total_latency"] / group["calls"]
+        return dict(groups)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the cost of an LLM call in USD from PRICES_PER_1K_TOKENS.
+
+    Args:
+        model (str): The model or deployment name.
+        prompt_tokens (int): Number of prompt tokens.
+        completion_tokens (int): Number of completion tokens.
+
+    Returns:
+        float: The estimated cost, or 0.0 for unknown models.
+    """
+    model = (model or "").lower()
+    for name in sorted(PRICES_PER_1K_TOKENS, key=len, reverse=True):
+        if model.startswith(name):
+            prompt_price, completion_price = PRICES_PER_1K_TOKENS[name]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+    return 0.0
+
+
+usage_tracker = UsageTracker()
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 from langchain_openai import AzureChatOpenAI
+from tools.llm_cache import llm_cache
+from tools.usage import usage_tracker
 
 
 def llm_init(deployment_name: str = "gpt-4o-mini", api_version: str = "2023-05-15") -> AzureChatOpenAI:
@@ -17,6 +19,8 @@ def llm_init(deployment_name: str = "gpt-4o-mini", api_version: str = "2023-05-1
         openai_api_key=os.environ["AZURE_OPENAI_API_KEY"],
         azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
         openai_api_version=api_version,
+        callbacks=[usage_tracker],
+        cache=llm_cache,
     )
 
 # LLM (Azure OpenAI) initialization
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Dict, List
+from googlesearch import search
+from tools.cache import PersistentCache
+from tools.concurrency import AsyncSingleFlight, SingleFlight
+
+
+SEARCH_TTL = 3 * 24 * 60 * 60
+SEARCH_EMPTY_TTL = 60 * 60  # empty result lists are often rate limits; retry sooner
+
+search_results = PersistentCache("search_results", ttl=SEARCH_TTL)
+_searches = SingleFlight()
+_async_searches = AsyncSingleFlight()
+
+
+def search_key(query: str) -> str:
+    """Return the cache key of a search query.
+
+    Args:
+        query (str): The search query.
+
+    Returns:
+        str: The query, lowercased and with whitespace collapsed.
+    """
+    return " ".join(query.split()).lower()
+
+
+def google_search(query: str, num_results: int = 10) -> List[Dict[str, str]]:
+    """Perform a Google search, sharing results between identical queries.
+
+    Results are cached for SEARCH_TTL; a cached search that returned at least as
+    many results as requested serves smaller requests too. Concurrent identical
+    queries wait for a single upstream search.
+
+    Args:
+        query (str): The search query.
+        num_results (int, optional): Number of results to return. Defaults to 10.
+
+    Returns:
+        List[Dict[str, str]]: Results with 'title', 'url' and 'description' keys.
+    """
+    key = search_key(query)
+
+    def run() -> List[Dict[str, str]]:
+        cached = search_results.get(key)
+        if cached is not None and cached["num_results"] >= num_results:
+            return cached["results"]
+        results = [
+            {"title": result.title, "url": result.url, "description": result.description}
+            for result in search(query, advanced=True, num_results=num_results)
+        ]
+        search_results.set(
+            key,
+            {"num_results": num_results, "results": results},
+            ttl=SEARCH_TTL if results else SEARCH_EMPTY_TTL,
+        )
+        return results
+
+    results = _searches.do(f"{key}\n{num_results}", run)
+    return [dict(result) for result in results[:num_results]]
+
+
+async def agoogle_search(query: str, num_results: int = 10) -> List[Dict[str, str]]:
+    """Perform a Google search without blocking the event loop.
+
+    Identical queries awaited concurrently share one worker thread running
+    google_search, which adds the result cache.
+
+    Args:
+        query (str): The search query.
+        num_results (int, optional): Number of results to return. Defaults to 10.
+
+    Returns:
+        List[Dict[str, str]]: Results with 'title', 'url' and 'description' keys.
+    """
+    results = await _async_searches.do(
+        f"{search_key(query)}\n{num_results}",
+        lambda: asyncio.to_thread(google_search, query, num_results),
+    )
+    return [dict(result) for result in results]
@@ -0,0 +1,312 @@
+import argparse
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from find_unis import (
+    PROFILE_BATCH_SIZE,
+    DetailAgent,
+    SearchAgent,
+    find_stored_university_profile,
+    partner_list_key,
+    partner_lists,
+    resolve_university_image,
+)
+from get_uni_details import get_uni_details
+from tools.cache import PersistentCache
+from tools.concurrency import map_with_deadlines
+from tools.names import canonical_university_key, canonical_university_name
+
+WARMUP_MAX_WORKERS = 2  # tasks of a stage running concurrently
+WARMUP_INTERVAL = 2.0  # seconds between the starts of two tasks, to stay below rate limits
+WARMUP_TIMEOUT = 300  # seconds a task may run; unfinished tasks are retried on the next run
+WARMUP_PROGRESS_TTL = 7 * 24 * 60 * 60  # completed tasks are done again on runs after this long
+STAGES = ("partners", "profiles", "images", "quotes")
+
+# Completed tasks by "stage|key", so an interrupted run resumes where it stopped
+warmup_progress = PersistentCache("warmup_progress", ttl=WARMUP_PROGRESS_TTL)
+
+
+def load_config(path: str) -> List[Tuple[str, str]]:
+    """Read the home universities and majors to warm up.
+
+    The config is a JSON file of the form
+    {"universities": [{"name": "University of Münster", "majors": ["Computer Science"]}]}.
+
+    Args:
+        path (str): Path of the config file.
+
+    Returns:
+        List[Tuple[str, str]]: (home university, major) pairs.
+
+    Raises:
+        ValueError: If the config does not have this form.
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    pairs = []
+    try:
+        for university in config["universities"]:
+            for major in university["majors"]:
+                pairs.append((university["name"], major))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid warmup config {path}: {str(e)}") from e
+    return pairs
+
+
+def run_stage(
+    stage: str,
+    items: Sequence[Any],
+    key: Callable[[Any], str],
+    task: Callable[[List[Any]], List[Any]],
+    max_workers: int,
+    interval: float,
+    timeout: float,
+    refresh: bool = False,
+    batch_size: int = 1,
+) -> None:
+    """Run a warmup task for every item not completed yet, throttled and in parallel.
+
+    Pending items are passed to ``task`` in batches of ``batch_size``. The task
+    returns one JSON-serializable value per item, which is recorded in
+    warmup_progress, or None for items it could not complete. Incomplete items,
+    and batches that raise or time out, are retried on the next run.
+
+    Batches start at least ``interval`` seconds apart, and a batch's ``timeout``
+    counts from its start. A batch that overruns it is abandoned: the stage moves
+    on without it, while the task finishes in a daemon thread that does not keep
+    the process from exiting.
+
+    Args:
+        stage (str): Name of the stage.
+        items (Sequence[Any]): The items to process.
+        key (Callable[[Any], str]): Identifies an item in the progress records.
+        task (Callable[[List[Any]], List[Any]]): Warms up the artifacts of a batch of items.
+        max_workers (int): Maximum number of concurrent tasks.
+        interval (float): Minimum seconds between the starts of two tasks.
+        timeout (float): Seconds a task may run.
+        refresh (bool, optional): Run tasks for items that were already completed.
+            Defaults to False.
+        batch_size (int, optional): Items per task. Defaults to 1.
+    """
+    pending = [
+        item for item in items
+        if refresh or warmup_progress.get(f"{stage}|{key(item)}") is None
+    ]
+    print(f"[{stage}] {len(pending)} to do, {len(items) - len(pending)} already done")
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+    def run(batch: List[Any]) -> int:
+        completed = 0
+        for item, value in zip(batch, task(batch)):
+            if value is None:
+                print(f"[{stage}] Nothing found for {key(item)}")
+                continue
+            warmup_progress.set(f"{stage}|{key(item)}", value)
+            completed += 1
+        return completed
+
+    def failed(batch: List[Any], error: Optional[BaseException]) -> int:
+        keys = ", ".join(key(item) for item in batch)
+        if error is None:
+            print(f"[{stage}] Timed out on {keys}")
+        else:
+            print(f"[{stage}] Failed on {keys}: {str(error)}")
+        return 0
+
+    completed = sum(map_with_deadlines(run, batches, max_workers, timeout, failed, interval))
+    print(f"[{stage}] {completed} done, {len(pending) - completed} left for the next run")
+
+
+def warm_partner_lists(pairs: List[Tuple[str, str]], refresh: bool = False, **options: Any) -> None:
+    """Find and store the partner universities of every home university and major.
+
+    Args:
+        pairs (List[Tuple[str, str]]): (home university, major) pairs.
+        refresh (bool, optional): Search again even if a partner list is stored.
+            Defaults to False.
+        **options: max_workers, interval and timeout of run_stage.
+    """
+    search_agent = SearchAgent()
+
+    def search(batch: List[Tuple[str, str]]) -> List[Optional[int]]:
+        university, major = batch[0]
+        partners = search_agent.run({"university": university, "major": major}, refresh=refresh)
+        return [len(partners) or None]
+
+    run_stage(
+        "partners", pairs, lambda pair: partner_list_key(*pair), search,
+        refresh=refresh, **options,
+    )
+
+
+def stored_partner_universities(pairs: List[Tuple[str, str]]) -> List[str]:
+    """Collect the stored partner universities of home universities and majors.
+
+    Args:
+        pairs (List[Tuple[str, str]]): (home university, major) pairs.
+
+    Returns:
+        List[str]: Canonical names of the partner universities, without duplicates.
+    """
+    partners = {}
+    for pair in pairs:
+        for name in partner_lists.get(partner_list_key(*pair)) or []:
+            partners.setdefault(canonical_university_key(name), canonical_university_name(name))
+    return list(partners.values())
+
+
+def warm_profiles(university_names: List[str], refresh: bool = False, **options: Any) -> None:
+    """Generate and store the profiles of universities in batched LLM calls.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+        refresh (bool, optional): Regenerate profiles even if they are stored.
+            Defaults to False.
+        **options: max_workers, interval and timeout of run_stage.
+    """
+    detail_agent = DetailAgent()
+
+    def prepare(batch: List[str]) -> List[Optional[bool]]:
+        detail_agent.prepare(batch, max_workers=1, timeout=options["timeout"], refresh=refresh)
+        return [find_stored_university_profile(name) is not None or None for name in batch]
+
+    run_stage(
+        "profiles", university_names, canonical_university_key, prepare,
+        refresh=refresh, batch_size=PROFILE_BATCH_SIZE, **options,
+    )
+
+
+def warm_images(university_names: List[str], refresh: bool = False, **options: Any) -> None:
+    """Resolve and store the campus images of universities.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+        refresh (bool, optional): Search again even if an image is stored.
+            Defaults to False.
+        **options: max_workers, interval and timeout of run_stage.
+    """
+    def resolve(batch: List[str]) -> List[Optional[str]]:
+        return [resolve_university_image(name, refresh=refresh) for name in batch]
+
+    run_stage(
+        "images", university_names, canonical_university_key, resolve,
+        refresh=refresh, **options,
+    )
+
+
+def warm_quotes(university_names: List[str], refresh: bool = False, **options: Any) -> None:
+    """Collect and store the student quotes of universities.
+
+    Args:
+        university_names (List[str]): Names of the universities.
+        refresh (bool, optional): Search again even if quotes are stored. Defaults to False.
+        **options: max_workers, interval and timeout of run_stage.
+    """
+    def collect(batch: List[str]) -> List[Optional[int]]:
+        return [len(get_uni_details(name, refresh=refresh).quotes) or None for name in batch]
+
+    run_stage(
+        "quotes", university_names, canonical_university_key, collect,
+        refresh=refresh, **options,
+    )
+
+
+def warmup(
+    pairs: List[Tuple[str, str]],
+    stages: Sequence[str] = STAGES,
+    max_workers: int = WARMUP_MAX_WORKERS,
+    interval: float = WARMUP_INTERVAL,
+    timeout: float = WARMUP_TIMEOUT,
+    refresh: bool = False,
+) -> None:
+    """Precompute partner lists, profiles, images and quotes for home universities and majors.
+
+    The other stages work on the partner universities stored for the pairs, so
+    without the "partners" stage they only cover pairs warmed up before.
+
+    Args:
+        pairs (List[Tuple[str, str]]): (home university, major) pairs.
+        stages (Sequence[str], optional): Stages to run, out of STAGES. Defaults to all.
+        max_workers (int, optional): Maximum number of concurrent tasks per stage.
+            Defaults to WARMUP_MAX_WORKERS.
+        interval (float, optional): Minimum seconds between the starts of two tasks.
+            Defaults to WARMUP_INTERVAL.
+        timeout (float, optional): Seconds a task may run. Defaults to WARMUP_TIMEOUT.
+        refresh (bool, optional): Recompute artifacts that are already stored.
+            Defaults to False.
+    """
+    options = {"max_workers": max_workers, "interval": interval, "timeout": timeout}
+    if "partners" in stages:
+        warm_partner_lists(pairs, refresh=refresh, **options)
+    university_names = stored_partner_universities(pairs)
+    print(f"Warming up {len(university_names)} partner universities")
+
+    if "profiles" in stages:
+        warm_profiles(university_names, refresh=refresh, **options)
+    if "images" in stages:
+        warm_images(university_names, refresh=refresh, **options)
+    if "quotes" in stages:
+        warm_quotes(university_names, refresh=refresh, **options)
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the warmup from the command line.
+
+    Args:
+        argv (List[str], optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Precompute partner lists, university profiles, campus images and student "
+            "quotes for popular home universities and majors. Interrupted runs resume "
+            "where they stopped."
+        )
+    )
+    parser.add_argument("config", help="JSON file listing home universities and their majors")
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"comma-separated stages to run (default: {','.join(STAGES)})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=WARMUP_MAX_WORKERS,
+        help=f"concurrent tasks per stage (default: {WARMUP_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=WARMUP_INTERVAL,
+        help=f"minimum seconds between task starts (default: {WARMUP_INTERVAL})",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=WARMUP_TIMEOUT,
+        help=f"seconds a task may run (default: {WARMUP_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true", help="recompute artifacts that are already stored"
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="forget the progress of earlier runs"
+    )
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    try:
+        pairs = load_config(args.config)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.reset:
+        warmup_progress.clear()
+    warmup(
+        pairs,
+        stages=stages,
+        max_workers=args.workers,
+        interval=args.interval,
+        timeout=args.timeout,
+        refresh=args.refresh,
+    )
+
+
+if __name__ == "__main__":
+    main()
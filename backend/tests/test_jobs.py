@@ -0,0 +1,97 @@
+import asyncio
+import time
+import pytest
+from tools.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_claim_takes_the_oldest_queued_job_of_its_kind(store):
+    first = store.submit("plan", {"n": 1})
+    store.submit("other", {"n": 2})
+    store.submit("plan", {"n": 3})
+
+    job = store.claim("plan")
+
+    assert job["id"] == first["id"]
+    assert job["status"] == RUNNING
+    assert job["attempts"] == 1
+    assert store.get(first["id"])["status"] == RUNNING
+    assert store.claim("plan")["params"] == {"n": 3}
+    assert store.claim("plan") is None
+
+
+def test_submit_shares_unfinished_jobs_with_the_same_key(store):
+    job = store.submit("plan", {"n": 1}, key="a")
+    assert store.submit("plan", {"n": 1}, key="a")["id"] == job["id"]
+
+    store.claim("plan")
+    assert store.submit("plan", {"n": 1}, key="a")["id"] == job["id"]
+
+    store.finish(job["id"], {"plan": "done"})
+    assert store.get(job["id"])["status"] == SUCCEEDED
+    assert store.get(job["id"])["result"] == {"plan": "done"}
+    assert store.submit("plan", {"n": 1}, key="a")["id"] != job["id"]
+
+
+def test_requeue_only_queues_jobs_whose_lease_expired(store):
+    expired = store.submit("plan", {"n": 1})
+    leased = store.submit("plan", {"n": 2})
+    store.claim("plan", lease=0)
+    store.claim("plan", lease=60)
+
+    assert store.requeue("plan", leased_before=time.time() + 1) == 1
+
+    assert store.get(expired["id"])["status"] == QUEUED
+    assert store.get(leased["id"])["status"] == RUNNING
+    assert store.claim("plan")["id"] == expired["id"]
+
+
+def test_requeue_fails_jobs_interrupted_max_attempts_times(store):
+    job = store.submit("plan", {"n": 1})
+
+    store.claim("plan", lease=0)
+    assert store.requeue("plan", leased_before=time.time() + 1, max_attempts=2) == 1
+    store.claim("plan", lease=0)
+    assert store.requeue("plan", leased_before=time.time() + 1, max_attempts=2) == 0
+
+    job = store.get(job["id"])
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert job["error"] == "Interrupted too often"
+    assert store.claim("plan") is None
+
+
+def test_finished_jobs_are_not_requeued(store):
+    job = store.submit("plan", {"n": 1})
+    store.claim("plan", lease=0)
+    store.fail(job["id"], "boom")
+
+    assert store.requeue("plan", leased_before=time.time() + 1) == 0
+    assert store.get(job["id"])["status"] == FAILED
+    assert store.get(job["id"])["error"] == "boom"
+
+
+def test_workers_keep_running_after_an_invalid_result(store):
+    async def handler(params):
+        return object() if params["n"] == 1 else params["n"]
+
+    async def run():
+        queue = JobQueue("plan", handler, workers=1, store=store)
+        await queue.start()
+        try:
+            invalid = await queue.submit({"n": 1})
+            valid = await queue.submit({"n": 2})
+            return await queue.wait(invalid["id"], 5), await queue.wait(valid["id"], 5)
+        finally:
+            await queue.stop()
+
+    invalid, valid = asyncio.run(run())
+
+    assert invalid["status"] == FAILED
+    assert invalid["error"].startswith("Invalid result")
+    assert valid["status"] == SUCCEEDED
+    assert valid["result"] == 2
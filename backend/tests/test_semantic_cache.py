@@ -0,0 +1,52 @@
+import pytest
+from tools.semantic_cache import HashingEmbeddings, SemanticCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def make_cache(path, threshold=0.95):
+    return SemanticCache("plans", threshold=threshold, embeddings=HashingEmbeddings(), path=path)
+
+
+def test_lookup_hits_on_the_same_words_in_another_form(path):
+    cache = make_cache(path)
+    cache.update("Computer Science", "plan")
+
+    assert cache.lookup("Computer Science") == "plan"
+    assert cache.lookup("computer-science") == "plan"
+    assert cache.lookup("Science, Computer") == "plan"
+
+
+def test_lookup_misses_related_but_different_questions(path):
+    cache = make_cache(path)
+    cache.update("Mathematics", "plan")
+
+    assert cache.lookup("Mathematics Education") is None
+    assert cache.lookup("History") is None
+
+
+def test_lookup_only_matches_within_the_same_scope(path):
+    cache = make_cache(path)
+    cache.update("Computer Science", "muenster plan", scope="muenster|ucsb")
+
+    assert cache.lookup("Computer Science", scope="muenster|ucsb") == "muenster plan"
+    assert cache.lookup("Computer Science", scope="granada|ucsb") is None
+    assert cache.lookup("Computer Science") is None
+
+
+def test_answers_survive_a_restart(path):
+    make_cache(path).update("Computer Science", "plan", scope="a")
+
+    assert make_cache(path).lookup("computer science", scope="a") == "plan"
+
+
+def test_clear_removes_all_answers(path):
+    cache = make_cache(path)
+    cache.update("Computer Science", "plan")
+    cache.clear()
+
+    assert cache.lookup("Computer Science") is None
+    assert make_cache(path).lookup("Computer Science") is None